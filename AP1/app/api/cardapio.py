@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Response
-from typing import Optional, Literal
-from app.schemas.cardapio_model import Cardapio
+from fastapi import APIRouter, File, Header, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from typing import Optional, List, Literal
+from app.schemas.cardapio_model import Cardapio, CardapioLote
+from app import config
+from app.utils.csv_utils import TIPOS_MIDIA, FORMATOS_COMPRESSAO
+from app.utils.exportacao import resposta_arquivo, resposta_sha256
+from app.utils.executor import executar
 from app.services.cardapio_service import (
     atualizar_item_cardapio,
     criar_item_cardapio,
-    listar_item_cardapio_id, listar_itens_cardapio,
+    listar_item_cardapio_id, listar_itens_cardapio, listar_itens_cardapio_stream,
     remover_item_cardapio,
+    processar_lote_cardapio,
+    importar_cardapio,
     get_qtd_itens_cardapio, get_cardapio_zip, get_cardapio_sha256, get_cardapio_xml
 )
 
@@ -19,38 +26,66 @@ async def obter_itens_cardapio(
     nome: Optional[str] = None, 
     descricao: Optional[str] = None, 
     preco: Optional[float] = None, 
-    categoria: Optional[Literal["Entrada", "Principal", "Sobremesa", "Bebida", "Acompanhamento", "Outro"]] = None, 
-    disponivel: Optional[bool] = None):
-    return listar_itens_cardapio(nome=nome, descricao=descricao, preco=preco, categoria=categoria, disponivel=disponivel)
+    preco_min: Optional[float] = None,
+    preco_max: Optional[float] = None,
+    categoria: Optional[List[Literal["Entrada", "Principal", "Sobremesa", "Bebida", "Acompanhamento", "Outro"]]] = Query(None), 
+    disponivel: Optional[bool] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    after_id: Optional[int] = None,
+    order_by: Optional[str] = None,
+    formato: Literal["json", "ndjson", "csv"] = "json"):
+    filtros = dict(nome=nome, descricao=descricao, preco=preco, preco_min=preco_min, preco_max=preco_max,
+                   categoria=categoria, disponivel=disponivel)
+    if formato != "json":
+        linhas = await executar(listar_itens_cardapio_stream, formato, limit=limit, offset=offset, after_id=after_id, order_by=order_by, **filtros)
+        return StreamingResponse(linhas, media_type=TIPOS_MIDIA[formato])
+    return await executar(listar_itens_cardapio, limit=limit, offset=offset, after_id=after_id, order_by=order_by, **filtros)
 
 @router.get("/count", response_model=dict)
 async def quantidade_total_cardapio():
-    return get_qtd_itens_cardapio()
+    return await executar(get_qtd_itens_cardapio)
 
 @router.get("/get_zip", response_class=Response)
-async def csv_to_zip():
-    return Response(content=get_cardapio_zip(), media_type="application/zip", headers={"Content-Disposition": "attachment; filename=cardapio.zip"})
+async def csv_to_zip(
+    compressao: Literal["zip", "gzip", "zstd"] = "zip",
+    nivel: int = Query(config.NIVEL_COMPRESSAO, ge=0, le=9),
+    if_none_match: Optional[str] = Header(None)
+):
+    arquivo, etag = await executar(get_cardapio_zip, compressao, nivel)
+    extensao, media_type = FORMATOS_COMPRESSAO[compressao]
+    return resposta_arquivo(arquivo, etag, if_none_match, media_type, f"cardapio.{extensao}")
 
 @router.get("/get_sha256", response_model=dict)
-async def get_sha256():
-    return {"hash_sha256": get_cardapio_sha256()}
+async def get_sha256(if_none_match: Optional[str] = Header(None)):
+    valor, etag = await executar(get_cardapio_sha256)
+    return resposta_sha256(valor, etag, if_none_match)
 
 @router.get("/get_xml")
-async def csv_to_xml():
-    return Response(content=get_cardapio_xml(), media_type="application/xml", headers={"Content-Disposition": "attachment; filename=cardapio.xml"})
+async def csv_to_xml(if_none_match: Optional[str] = Header(None)):
+    arquivo, etag = await executar(get_cardapio_xml)
+    return resposta_arquivo(arquivo, etag, if_none_match, "application/xml", "cardapio.xml")
+
+@router.post("/batch", response_model=dict)
+async def lote_cardapio(lote: CardapioLote):
+    return await executar(processar_lote_cardapio, lote)
+
+@router.post("/import", response_model=dict)
+async def importar_csv(arquivo: UploadFile = File(...)):
+    return await executar(importar_cardapio, arquivo.file)
 
 @router.get("/{cardapio_id}", response_model=dict)
 async def obter_item_cardapio_id(cardapio_id: int):
-    return listar_item_cardapio_id(cardapio_id)
+    return await executar(listar_item_cardapio_id, cardapio_id)
 
 @router.post("/", response_model=dict)
 async def adicionar_item_cardapio(cardapio: Cardapio):
-    return criar_item_cardapio(cardapio)
+    return await executar(criar_item_cardapio, cardapio)
 
 @router.put("/{cardapio_id}", response_model=dict)
 async def modificar_item_cardapio(cardapio_id: int, cardapio: Cardapio):
-    return atualizar_item_cardapio(cardapio_id, cardapio)
+    return await executar(atualizar_item_cardapio, cardapio_id, cardapio)
 
 @router.delete("/{cardapio_id}", response_model=dict)
 async def deletar_item_cardapio(cardapio_id: int):
-    return remover_item_cardapio(cardapio_id)
\ No newline at end of file
+    return await executar(remover_item_cardapio, cardapio_id)
\ No newline at end of file
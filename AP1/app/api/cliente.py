@@ -1,12 +1,19 @@
-from fastapi import APIRouter, Response
-from typing import Optional
+from fastapi import APIRouter, File, Header, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from typing import Optional, List, Literal
 from datetime import date
-from app.schemas.cliente_model import Cliente
+from app.schemas.cliente_model import Cliente, ClienteLote
+from app import config
+from app.utils.csv_utils import TIPOS_MIDIA, FORMATOS_COMPRESSAO
+from app.utils.exportacao import resposta_arquivo, resposta_sha256
+from app.utils.executor import executar
 from app.services.cliente_service import (
     criar_cliente,
-    listar_clientes, listar_cliente_id,
+    listar_clientes, listar_clientes_stream, listar_cliente_id,
     atualizar_cliente,
     remover_cliente,
+    processar_lote_clientes,
+    importar_clientes,
     get_qtd_clientes, get_cliente_zip, get_cliente_sha256, get_cliente_xml
 )
 
@@ -18,41 +25,69 @@ router = APIRouter(
 @router.get("/", response_model=list[dict])
 async def obter_clientes(
     nome: Optional[str] = None,
-    email: Optional[str] = None,
+    email: Optional[List[str]] = Query(None),
     telefone: Optional[str] = None,
     data_nascimento: Optional[date] = None,
-    cpf: Optional[str] = None
+    data_nascimento_min: Optional[date] = None,
+    data_nascimento_max: Optional[date] = None,
+    cpf: Optional[List[str]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    after_id: Optional[int] = None,
+    order_by: Optional[str] = None,
+    formato: Literal["json", "ndjson", "csv"] = "json"
 ):
-    return listar_clientes(nome=nome, email=email, telefone=telefone, data_nascimento=data_nascimento, cpf=cpf)
+    filtros = dict(nome=nome, email=email, telefone=telefone, data_nascimento=data_nascimento,
+                   data_nascimento_min=data_nascimento_min, data_nascimento_max=data_nascimento_max, cpf=cpf)
+    if formato != "json":
+        linhas = await executar(listar_clientes_stream, formato, limit=limit, offset=offset, after_id=after_id, order_by=order_by, **filtros)
+        return StreamingResponse(linhas, media_type=TIPOS_MIDIA[formato])
+    return await executar(listar_clientes, limit=limit, offset=offset, after_id=after_id, order_by=order_by, **filtros)
 
 @router.get("/count", response_model=dict)
 async def quantidade_total_cliente():
-    return get_qtd_clientes()
+    return await executar(get_qtd_clientes)
 
 @router.get("/get_zip", response_class=Response)
-async def csv_to_zip():
-    return Response(content=get_cliente_zip(), media_type="application/zip", headers={"Content-Disposition": "attachment; filename=cliente.zip"})
+async def csv_to_zip(
+    compressao: Literal["zip", "gzip", "zstd"] = "zip",
+    nivel: int = Query(config.NIVEL_COMPRESSAO, ge=0, le=9),
+    if_none_match: Optional[str] = Header(None)
+):
+    arquivo, etag = await executar(get_cliente_zip, compressao, nivel)
+    extensao, media_type = FORMATOS_COMPRESSAO[compressao]
+    return resposta_arquivo(arquivo, etag, if_none_match, media_type, f"cliente.{extensao}")
 
 @router.get("/get_sha256", response_model=dict)
-async def get_sha256():
-    return {"hash_sha256": get_cliente_sha256()}
+async def get_sha256(if_none_match: Optional[str] = Header(None)):
+    valor, etag = await executar(get_cliente_sha256)
+    return resposta_sha256(valor, etag, if_none_match)
 
 @router.get("/get_xml")
-async def csv_to_xml():
-    return Response(content=get_cliente_xml(), media_type="application/xml", headers={"Content-Disposition": "attachment; filename=cliente.xml"})
+async def csv_to_xml(if_none_match: Optional[str] = Header(None)):
+    arquivo, etag = await executar(get_cliente_xml)
+    return resposta_arquivo(arquivo, etag, if_none_match, "application/xml", "cliente.xml")
+
+@router.post("/batch", response_model=dict)
+async def lote_clientes(lote: ClienteLote):
+    return await executar(processar_lote_clientes, lote)
+
+@router.post("/import", response_model=dict)
+async def importar_csv(arquivo: UploadFile = File(...)):
+    return await executar(importar_clientes, arquivo.file)
 
 @router.get("/{cliente_id}", response_model=dict)
 async def obter_cliente_id(cliente_id: int):
-    return listar_cliente_id(cliente_id)
+    return await executar(listar_cliente_id, cliente_id)
 
 @router.post("/", response_model=dict)
 async def adicionar_cliente(cliente: Cliente):
-    return criar_cliente(cliente)
+    return await executar(criar_cliente, cliente)
 
 @router.put("/{cliente_id}", response_model=dict)
 async def modificar_cliente(cliente_id: int, cliente: Cliente):
-    return atualizar_cliente(cliente_id, cliente)
+    return await executar(atualizar_cliente, cliente_id, cliente)
 
 @router.delete("/{cliente_id}", response_model=dict)
 async def deletar_cliente(cliente_id: int):
-    return remover_cliente(cliente_id)
\ No newline at end of file
+    return await executar(remover_cliente, cliente_id)
\ No newline at end of file
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Header, Query, Response
+from typing import Optional
+from app import config
+from app.utils.exportacao import resposta_arquivo
+from app.utils.executor import executar
+from app.services.export_service import get_snapshot
+
+router = APIRouter(
+    prefix="/export",
+    tags=["export"]
+)
+
+@router.get("/snapshot", response_class=Response)
+async def snapshot(
+    nivel: int = Query(config.NIVEL_COMPRESSAO, ge=0, le=9),
+    if_none_match: Optional[str] = Header(None)
+):
+    arquivo, etag = await executar(get_snapshot, nivel)
+    return resposta_arquivo(arquivo, etag, if_none_match, "application/zip", "snapshot.zip")
@@ -1,14 +1,22 @@
-from fastapi import APIRouter, Response
+from fastapi import APIRouter, File, Header, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from typing import Optional, List, Literal
 from datetime import datetime
-from app.schemas.pedido_model import Pedido
+from app.schemas.pedido_model import Pedido, PedidoLote
+from app import config
+from app.utils.csv_utils import TIPOS_MIDIA, FORMATOS_COMPRESSAO
+from app.utils.exportacao import resposta_arquivo, resposta_sha256
+from app.utils.executor import executar
 from app.services.pedido_service import (
     criar_pedido,
-    listar_pedidos, listar_pedido_id,
+    listar_pedidos, listar_pedidos_stream, listar_pedido_id,
     atualizar_pedido,
     remover_pedido,
+    processar_lote_pedidos,
+    importar_pedidos,
     get_qtd_pedidos, get_pedido_zip, get_pedido_sha256, get_pedido_xml
 )
+from app.services.analytics_service import receita_por_dia, ticket_medio_por_cliente, top_itens
 
 router = APIRouter(
     prefix="/pedido",
@@ -18,41 +26,82 @@ router = APIRouter(
 @router.get("/", response_model=list[dict])
 async def obter_pedidos(
     cliente_id: Optional[int] = None,
-    itens: Optional[List[int]] = None,
+    itens: Optional[List[int]] = Query(None),
     data_hora_pedido: Optional[datetime] = None,
-    status: Optional[Literal["Em aberto", "Fechado"]] = None,
-    forma_pagamento: Optional[Literal["Pix", "Cartão", "Dinheiro"]] = None
+    data_hora_pedido_min: Optional[datetime] = None,
+    data_hora_pedido_max: Optional[datetime] = None,
+    status: Optional[List[Literal["Em aberto", "Fechado"]]] = Query(None),
+    forma_pagamento: Optional[List[Literal["Pix", "Cartão", "Dinheiro"]]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    after_id: Optional[int] = None,
+    order_by: Optional[str] = None,
+    formato: Literal["json", "ndjson", "csv"] = "json"
 ):
-    return listar_pedidos(cliente_id=cliente_id, itens=itens, data_hora_pedido=data_hora_pedido, status=status, forma_pagamento=forma_pagamento)
+    filtros = dict(cliente_id=cliente_id, itens=itens, data_hora_pedido=data_hora_pedido,
+                   data_hora_pedido_min=data_hora_pedido_min, data_hora_pedido_max=data_hora_pedido_max,
+                   status=status, forma_pagamento=forma_pagamento)
+    if formato != "json":
+        linhas = await executar(listar_pedidos_stream, formato, limit=limit, offset=offset, after_id=after_id, order_by=order_by, **filtros)
+        return StreamingResponse(linhas, media_type=TIPOS_MIDIA[formato])
+    return await executar(listar_pedidos, limit=limit, offset=offset, after_id=after_id, order_by=order_by, **filtros)
 
 @router.get("/count", response_model=dict)
 async def quantidade_total_pedido():
-    return get_qtd_pedidos()
+    return await executar(get_qtd_pedidos)
 
 @router.get("/get_zip", response_class=Response)
-async def csv_to_zip():
-    return Response(content=get_pedido_zip(), media_type="application/zip", headers={"Content-Disposition": "attachment; filename=pedido.zip"})
+async def csv_to_zip(
+    compressao: Literal["zip", "gzip", "zstd"] = "zip",
+    nivel: int = Query(config.NIVEL_COMPRESSAO, ge=0, le=9),
+    if_none_match: Optional[str] = Header(None)
+):
+    arquivo, etag = await executar(get_pedido_zip, compressao, nivel)
+    extensao, media_type = FORMATOS_COMPRESSAO[compressao]
+    return resposta_arquivo(arquivo, etag, if_none_match, media_type, f"pedido.{extensao}")
 
 @router.get("/get_sha256", response_model=dict)
-async def get_sha256():
-    return {"hash_sha256": get_pedido_sha256()}
+async def get_sha256(if_none_match: Optional[str] = Header(None)):
+    valor, etag = await executar(get_pedido_sha256)
+    return resposta_sha256(valor, etag, if_none_match)
 
 @router.get("/get_xml")
-async def csv_to_xml():
-    return Response(content=get_pedido_xml(), media_type="application/xml", headers={"Content-Disposition": "attachment; filename=pedido.xml"})
+async def csv_to_xml(if_none_match: Optional[str] = Header(None)):
+    arquivo, etag = await executar(get_pedido_xml)
+    return resposta_arquivo(arquivo, etag, if_none_match, "application/xml", "pedido.xml")
+
+@router.get("/analytics/receita_por_dia", response_model=list[dict])
+async def analytics_receita_por_dia():
+    return await executar(receita_por_dia)
+
+@router.get("/analytics/ticket_medio", response_model=list[dict])
+async def analytics_ticket_medio():
+    return await executar(ticket_medio_por_cliente)
+
+@router.get("/analytics/top_itens", response_model=list[dict])
+async def analytics_top_itens(limit: int = Query(10, ge=1)):
+    return await executar(top_itens, limit)
+
+@router.post("/batch", response_model=dict)
+async def lote_pedidos(lote: PedidoLote):
+    return await executar(processar_lote_pedidos, lote)
+
+@router.post("/import", response_model=dict)
+async def importar_csv(arquivo: UploadFile = File(...)):
+    return await executar(importar_pedidos, arquivo.file)
 
 @router.get("/{pedido_id}", response_model=dict)
 async def obter_pedido_id(pedido_id: int):
-    return listar_pedido_id(pedido_id)
+    return await executar(listar_pedido_id, pedido_id)
 
 @router.post("/", response_model=dict)
 async def adicionar_pedido(pedido: Pedido):
-    return criar_pedido(pedido)
+    return await executar(criar_pedido, pedido)
 
 @router.put("/{pedido_id}", response_model=dict)
 async def modificar_pedido(pedido_id: int, pedido: Pedido):
-    return atualizar_pedido(pedido_id, pedido)
+    return await executar(atualizar_pedido, pedido_id, pedido)
 
 @router.delete("/{pedido_id}", response_model=dict)
 async def deletar_pedido(pedido_id: int):
-    return remover_pedido(pedido_id)
\ No newline at end of file
+    return await executar(remover_pedido, pedido_id)
\ No newline at end of file
@@ -0,0 +1,33 @@
+import os
+
+# "csv" reescreve o arquivo inteiro a cada alteração; "journal" grava
+# atualizações e remoções em um log append-only ao lado do CSV.
+MODO_ARMAZENAMENTO = os.getenv("AP1_MODO_ARMAZENAMENTO", "csv")
+INTERVALO_COMPACTACAO = float(os.getenv("AP1_INTERVALO_COMPACTACAO", "30"))
+
+# Formato do snapshot de cada tabela: "csv", "parquet" ou "arrow" (Arrow IPC,
+# lido via mmap). Os dois últimos exigem pyarrow e gravam tudo pelo journal.
+FORMATO_ARMAZENAMENTO = os.getenv("AP1_FORMATO_ARMAZENAMENTO", "csv")
+
+# Linhas por bloco nas leituras em streaming (pd.read_csv(chunksize=...)).
+TAMANHO_BLOCO = int(os.getenv("AP1_TAMANHO_BLOCO", "10000"))
+
+# Artefatos de exportação (zip, xml) guardados por geração de cada tabela.
+DIRETORIO_EXPORTACAO = os.getenv("AP1_DIRETORIO_EXPORTACAO", "app/data/exports")
+
+# Nível padrão (0-9) das exportações compactadas; 0 grava sem compressão.
+NIVEL_COMPRESSAO = int(os.getenv("AP1_NIVEL_COMPRESSAO", "6"))
+
+# Quantos erros de linha o relatório de uma importação de CSV lista; os
+# demais só entram na contagem de rejeitados.
+LIMITE_ERROS_IMPORTACAO = int(os.getenv("AP1_LIMITE_ERROS_IMPORTACAO", "1000"))
+
+# Threads do pool que executa o trabalho bloqueante (pandas, disco) fora do
+# event loop. Chamadas além desse limite esperam na fila do pool.
+POOL_WORKERS = int(os.getenv("AP1_POOL_WORKERS", str(min(32, (os.cpu_count() or 1) + 4))))
+
+# Rotação de app/logs/*.log: por tamanho (bytes) ou por tempo (horas), o que
+# vier primeiro, mantendo LOG_BACKUPS arquivos antigos.
+LOG_MAX_BYTES = int(os.getenv("AP1_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_INTERVALO_ROTACAO = float(os.getenv("AP1_LOG_INTERVALO_ROTACAO", "24"))
+LOG_BACKUPS = int(os.getenv("AP1_LOG_BACKUPS", "7"))
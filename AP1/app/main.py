@@ -1,12 +1,46 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api import cliente, cardapio, pedido
+from app.api import cliente, cardapio, pedido, export
+from app.services.cliente_service import CLIENTE_FILE
+from app.services.cardapio_service import CARDAPIO_FILE
+from app.services.pedido_service import PEDIDO_FILE
+from app.utils import armazenamento, cache, executor
 
-app = FastAPI()
+ARQUIVOS = [CLIENTE_FILE, CARDAPIO_FILE, PEDIDO_FILE]
+
+@asynccontextmanager
+async def lifespan(_):
+    # Um journal deixado por uma execução anterior é incorporado antes de
+    # qualquer leitura, inclusive quando o modo atual é "csv".
+    for arquivo in ARQUIVOS:
+        armazenamento.compactar(arquivo)
+        armazenamento.contar(arquivo, recontar=True)
+
+    compactador = None
+    if armazenamento.modo_journal():
+        compactador = armazenamento.iniciar_compactador(ARQUIVOS)
+    yield
+    if compactador is not None:
+        compactador.set()
+    for arquivo in ARQUIVOS:
+        armazenamento.compactar(arquivo)
+    executor.encerrar()
+
+app = FastAPI(lifespan=lifespan)
 
 @app.get("/")
 def home():
     return {"msg": "Home"}
 
+@app.get("/cache")
+def estatisticas_cache():
+    return cache.get_estatisticas()
+
+@app.get("/executor")
+def estatisticas_executor():
+    return executor.get_estatisticas()
+
 app.include_router(cliente.router)
 app.include_router(cardapio.router)
-app.include_router(pedido.router)
\ No newline at end of file
+app.include_router(pedido.router)
+app.include_router(export.router)
\ No newline at end of file
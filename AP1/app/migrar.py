@@ -0,0 +1,64 @@
+import argparse
+import pandas as pd
+from app.services.cliente_service import CLIENTE_FILE
+from app.services.cardapio_service import CARDAPIO_FILE
+from app.services.pedido_service import PEDIDO_FILE
+from app.utils import cache, colunar, csv_utils, esquema, indice, journal, lock, metadados
+from app.utils.logger import get_logger
+
+# Converte as tabelas de app/data entre formatos de armazenamento:
+#     python -m app.migrar parquet
+#     python -m app.migrar csv --origem parquet
+# O journal pendente é incorporado ao arquivo novo e também ao de origem antes
+# de ser descartado, para que voltar ao formato anterior não perca as
+# escritas feitas desde a última compactação. Depois é só trocar
+# AP1_FORMATO_ARMAZENAMENTO.
+ARQUIVOS = [CLIENTE_FILE, CARDAPIO_FILE, PEDIDO_FILE]
+FORMATOS = ["csv", *colunar.EXTENSOES]
+
+logger = get_logger("migracao")
+
+def _ler(caminho: str, formato: str) -> pd.DataFrame:
+    if colunar.ativo(formato):
+        return colunar.ler(caminho, formato=formato)
+    return pd.read_csv(caminho, index_col=False, dtype=esquema.dtypes_leitura(caminho))
+
+def _escrever(df: pd.DataFrame, caminho: str, formato: str) -> None:
+    metadados.marcar_reescrita(caminho)
+    if colunar.ativo(formato):
+        colunar.escrever(df, caminho, formato)
+    else:
+        csv_utils.escrever_atomico(esquema.exibir(caminho, df), caminho)
+
+def migrar(caminho: str, origem: str, destino: str) -> int:
+    with lock.escrita(caminho):
+        operacoes = journal.ler_operacoes(caminho)
+        df = journal.aplicar(_ler(caminho, origem), operacoes)
+        _escrever(df, caminho, destino)
+        # Se o processo cair antes do descarte, o journal é reaplicado sem
+        # efeito sobre qualquer um dos dois arquivos.
+        if operacoes:
+            _escrever(df, caminho, origem)
+        journal.descartar(caminho)
+        indice.invalidar(caminho)
+        cache.invalidar(caminho)
+    return len(df)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Converte as tabelas de app/data para outro formato de armazenamento")
+    parser.add_argument("destino", choices=FORMATOS)
+    parser.add_argument("--origem", choices=FORMATOS, default="csv")
+    args = parser.parse_args()
+    if args.origem == args.destino:
+        parser.error("origem e destino são o mesmo formato")
+
+    for caminho in ARQUIVOS:
+        try:
+            linhas = migrar(caminho, args.origem, args.destino)
+            logger.info(f"{caminho} migrado de {args.origem} para {args.destino} ({linhas} linhas)")
+        except Exception as e:
+            logger.error(f"Erro ao migrar {caminho}: {e}")
+            raise
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Literal
+from typing import List, Literal
 
 class Cardapio(BaseModel):
     id: int = None
@@ -7,4 +7,9 @@ class Cardapio(BaseModel):
     descricao: str
     preco: float
     categoria: Literal["Entrada", "Principal", "Sobremesa", "Bebida", "Acompanhamento", "Outro"]
-    disponivel: bool
\ No newline at end of file
+    disponivel: bool
+
+class CardapioLote(BaseModel):
+    criar: List[Cardapio] = []
+    atualizar: List[Cardapio] = []
+    remover: List[int] = []
\ No newline at end of file
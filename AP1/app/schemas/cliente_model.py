@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from typing import List
 from datetime import date
 
 class Cliente(BaseModel):
@@ -7,4 +8,9 @@ class Cliente(BaseModel):
     email: str
     telefone: str
     data_nascimento: date
-    cpf: str
\ No newline at end of file
+    cpf: str
+
+class ClienteLote(BaseModel):
+    criar: List[Cliente] = []
+    atualizar: List[Cliente] = []
+    remover: List[int] = []
\ No newline at end of file
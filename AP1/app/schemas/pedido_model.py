@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Literal, Optional
 from datetime import datetime
 
@@ -6,6 +6,11 @@ class Pedido(BaseModel):
     id: int = None
     cliente_id: int
     itens: List[int]
-    data_hora_pedido : datetime = datetime.now
+    data_hora_pedido : datetime = Field(default_factory=datetime.now)
     status: Literal["Em aberto", "Fechado"]
-    forma_pagamento: Optional[Literal["Pix", "Cartão", "Dinheiro"]] = None
\ No newline at end of file
+    forma_pagamento: Optional[Literal["Pix", "Cartão", "Dinheiro"]] = None
+
+class PedidoLote(BaseModel):
+    criar: List[Pedido] = []
+    atualizar: List[Pedido] = []
+    remover: List[int] = []
\ No newline at end of file
@@ -0,0 +1,121 @@
+import threading
+import pandas as pd
+from app.utils import armazenamento, metadados
+from app.utils.logger import get_logger
+from app.services.cardapio_service import CARDAPIO_FILE, carregar_dados_csv as carregar_cardapio
+from app.services.pedido_service import PEDIDO_FILE, carregar_dados_csv as carregar_pedidos
+
+logger = get_logger("analytics")
+_lock = threading.Lock()
+_estado: dict = {}
+
+def _agregar(pedidos: pd.DataFrame, precos: pd.Series) -> dict[str, pd.DataFrame]:
+    # Só pedidos fechados contam como venda. O valor do pedido é a soma dos
+    # preços atuais do cardapio; itens removidos do cardapio valem 0.
+    fechados = pedidos[pedidos["status"] == "Fechado"]
+    itens = fechados[["id", "itens"]].explode("itens").dropna(subset=["itens"])
+    itens["item_id"] = itens["itens"].astype("int64")
+    itens["preco"] = precos.reindex(itens["item_id"]).fillna(0).to_numpy()
+
+    valores = fechados["id"].map(itens.groupby("id")["preco"].sum()).fillna(0)
+    vendas = pd.DataFrame({
+        "dia": pd.to_datetime(fechados["data_hora_pedido"], errors="coerce", utc=True, format="ISO8601").dt.strftime("%Y-%m-%d"),
+        "cliente_id": fechados["cliente_id"],
+        "valor": valores,
+        "pedidos": 1,
+    })
+    return {
+        "dias": vendas.groupby("dia")[["valor", "pedidos"]].sum(),
+        "clientes": vendas.groupby("cliente_id")[["valor", "pedidos"]].sum(),
+        "itens": itens.assign(quantidade=1).groupby("item_id")[["quantidade", "preco"]].sum(),
+    }
+
+def _somar(atual: dict[str, pd.DataFrame], novos: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+    return {nome: atual[nome].add(novos[nome], fill_value=0) for nome in atual}
+
+def _so_inclusoes(antes: list, atual: list, reescritas_antes: int, reescritas: int) -> bool:
+    # Nenhuma reescrita registrada no .meta, mesmo inode, arquivo maior e o
+    # resto (journal) igual: só houve append. O inode sozinho não basta, já
+    # que o os.replace pode reaproveitá-lo.
+    (dados_antes, *resto_antes), (dados_atual, *resto_atual) = antes, atual
+    return (
+        reescritas_antes == reescritas
+        and dados_antes is not None and dados_atual is not None
+        and dados_antes[0] == dados_atual[0] and dados_antes[1] <= dados_atual[1]
+        and resto_antes == resto_atual
+    )
+
+def _agregados() -> dict[str, pd.DataFrame]:
+    # Guardados por geração de pedido e cardapio. Quando pedido só recebeu
+    # inclusões, apenas as linhas novas são agregadas e somadas ao resultado.
+    # O contador de reescritas é lido antes da assinatura: uma troca entre as
+    # duas leituras só força o recálculo completo na próxima chamada.
+    reescritas = metadados.reescritas(PEDIDO_FILE)
+    assinaturas = (armazenamento.assinatura(PEDIDO_FILE), armazenamento.assinatura(CARDAPIO_FILE))
+    pedidos = carregar_pedidos()
+    with _lock:
+        estado = dict(_estado)
+
+    if estado.get("assinaturas") == assinaturas:
+        return estado["agregados"]
+
+    cardapio = carregar_cardapio()
+    precos = pd.Series(cardapio["preco"].to_numpy(dtype=float), index=cardapio["id"].to_numpy(dtype="int64"))
+    if (
+        estado
+        and estado["assinaturas"][1] == assinaturas[1]
+        and _so_inclusoes(estado["assinaturas"][0], assinaturas[0], estado["reescritas"], reescritas)
+        and len(pedidos) >= estado["linhas"]
+    ):
+        agregados = _somar(estado["agregados"], _agregar(pedidos.iloc[estado["linhas"]:], precos))
+    else:
+        agregados = _agregar(pedidos, precos)
+
+    with _lock:
+        _estado.update({"assinaturas": assinaturas, "reescritas": reescritas, "linhas": len(pedidos), "agregados": agregados})
+    return agregados
+
+def receita_por_dia() -> list[dict]:
+    try:
+        dias = _agregados()["dias"].sort_index()
+        return [
+            {"dia": dia, "receita": round(float(linha["valor"]), 2), "pedidos": int(linha["pedidos"])}
+            for dia, linha in dias.iterrows()
+        ]
+    except Exception as e:
+        logger.error(f"Erro ao calcular receita por dia: {e}")
+        raise RuntimeError(f"Erro ao calcular receita por dia: {e}")
+
+def ticket_medio_por_cliente() -> list[dict]:
+    try:
+        clientes = _agregados()["clientes"].sort_index()
+        return [
+            {
+                "cliente_id": int(cliente_id),
+                "pedidos": int(linha["pedidos"]),
+                "total": round(float(linha["valor"]), 2),
+                "ticket_medio": round(float(linha["valor"] / linha["pedidos"]), 2),
+            }
+            for cliente_id, linha in clientes.iterrows()
+        ]
+    except Exception as e:
+        logger.error(f"Erro ao calcular ticket médio: {e}")
+        raise RuntimeError(f"Erro ao calcular ticket médio: {e}")
+
+def top_itens(limit: int = 10) -> list[dict]:
+    try:
+        itens = _agregados()["itens"].sort_values(["quantidade", "preco"], ascending=False, kind="stable").head(limit)
+        cardapio = carregar_cardapio()
+        nomes = pd.Series(cardapio["nome"].to_numpy(), index=cardapio["id"].to_numpy(dtype="int64"))
+        return [
+            {
+                "item_id": int(item_id),
+                "nome": nomes.get(item_id),
+                "quantidade": int(linha["quantidade"]),
+                "receita": round(float(linha["preco"]), 2),
+            }
+            for item_id, linha in itens.iterrows()
+        ]
+    except Exception as e:
+        logger.error(f"Erro ao calcular itens mais vendidos: {e}")
+        raise RuntimeError(f"Erro ao calcular itens mais vendidos: {e}")
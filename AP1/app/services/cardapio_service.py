@@ -1,36 +1,23 @@
-import os
 import pandas as pd
-from app.schemas.cardapio_model import Cardapio
+from typing import BinaryIO, Iterator
+from app.schemas.cardapio_model import Cardapio, CardapioLote
 from fastapi import HTTPException
 from http import HTTPStatus
-from app.utils import csv_utils
+from app import config
+from app.utils import csv_utils, armazenamento, esquema, exportacao, importacao, paginacao
 from app.utils.logger import get_logger
 
 CARDAPIO_FILE = "app/data/cardapio.csv"
 logger = get_logger("cardapio")
+esquema.registrar(CARDAPIO_FILE, Cardapio)
 
 def carregar_dados_csv() -> pd.DataFrame:
-    os.makedirs(os.path.dirname(CARDAPIO_FILE), exist_ok=True)
-    
-    if os.path.exists(CARDAPIO_FILE) and os.path.getsize(CARDAPIO_FILE) > 0:
-        return pd.read_csv(CARDAPIO_FILE, index_col=False)
-    
-    df_vazio = pd.DataFrame(columns=Cardapio.model_fields.keys())
-    df_vazio.to_csv(CARDAPIO_FILE, index=False)
-    return df_vazio
+    return armazenamento.carregar(CARDAPIO_FILE, Cardapio.model_fields.keys())
 
 def criar_item_cardapio(cardapio_item: Cardapio) -> dict:
     try:
-        cardapio = carregar_dados_csv()
-        novo_id = 0
-        if not cardapio.empty and "id" in cardapio.columns:
-            novo_id = int(cardapio["id"].max()) + 1
-        
-        cardapio_item.id = novo_id
-        novo_df = pd.DataFrame([cardapio_item.model_dump()])
-
-        cardapio = pd.concat([cardapio, novo_df], ignore_index=True)
-        novo_df.to_csv(CARDAPIO_FILE, mode="a", index=False, header=False)
+        cardapio_item.id = armazenamento.proximo_id(CARDAPIO_FILE)
+        armazenamento.anexar(CARDAPIO_FILE, Cardapio.model_fields.keys(), [cardapio_item.model_dump()])
 
         logger.info("Item do cardapio criado com sucesso")
         return {"id": cardapio_item.id, "message": "Item do cardapio criado com sucesso"}
@@ -38,22 +25,32 @@ def criar_item_cardapio(cardapio_item: Cardapio) -> dict:
         logger.error(f"Erro ao criar item do cardapio: {e}")
         raise RuntimeError(f"Erro ao criar item do cardapio: {e}")
 
-def listar_itens_cardapio(**filtros) -> list[dict]:
-    df = carregar_dados_csv()
-    for campo, valor in filtros.items():
-        if valor:
-            if campo in df.columns:
-                df = df[df[campo].astype(str).str.contains(str(valor), case=False, na=False)]
-    return df.to_dict(orient="records")
+def _paginar(limit, offset, after_id, order_by, filtros) -> pd.DataFrame:
+    try:
+        return paginacao.paginar(CARDAPIO_FILE, carregar_dados_csv(), Cardapio, filtros, limit, offset, after_id, order_by)
+    except ValueError as e:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
+
+def listar_itens_cardapio(limit: int = None, offset: int = 0, after_id: int = None, order_by: str = None, **filtros) -> list[dict]:
+    return esquema.registros(CARDAPIO_FILE, _paginar(limit, offset, after_id, order_by, filtros))
+
+def listar_itens_cardapio_stream(formato: str, limit: int = None, offset: int = 0, after_id: int = None, order_by: str = None, **filtros) -> Iterator[str]:
+    if order_by:
+        # Ordenar exige a tabela inteira; só a página já ordenada é fatiada.
+        blocos = csv_utils.fatiar(_paginar(limit, offset, after_id, order_by, filtros), config.TAMANHO_BLOCO)
+    else:
+        blocos = paginacao.paginar_blocos(
+            CARDAPIO_FILE, armazenamento.ler_em_blocos(CARDAPIO_FILE, Cardapio.model_fields.keys(), Cardapio, filtros), Cardapio, filtros, limit, offset, after_id
+        )
+    return csv_utils.serializar_blocos((esquema.exibir(CARDAPIO_FILE, bloco) for bloco in blocos), formato)
 
 def listar_item_cardapio_id(cardapio_id) -> dict:
     try:
-        cardapio = carregar_dados_csv()
-        item_cardapio = cardapio[cardapio["id"] == cardapio_id]
-        if item_cardapio.empty:
+        item_cardapio = armazenamento.buscar_por_id(CARDAPIO_FILE, Cardapio.model_fields.keys(), cardapio_id)
+        if item_cardapio is None:
             raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Item do cardapio não encontrado")
         else:
-            return item_cardapio.iloc[0].to_dict()
+            return item_cardapio
     except HTTPException:
         raise
     except Exception as e:
@@ -63,16 +60,10 @@ def listar_item_cardapio_id(cardapio_id) -> dict:
 def atualizar_item_cardapio(cardapio_id: int, dados_atualizados: Cardapio) -> dict:
     try:
         cardapio = carregar_dados_csv()
-        indice = cardapio[cardapio["id"] == cardapio_id].index
-
-        if indice.empty:
+        if cardapio_id not in armazenamento.posicoes_por_id(CARDAPIO_FILE, cardapio):
             raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Item do cardapio não encontrado")
 
-        dados_dict = dados_atualizados.model_dump()
-        dados_dict["id"] = cardapio_id
-
-        cardapio.loc[indice[0]] = dados_dict
-        cardapio.to_csv(CARDAPIO_FILE, index=False)
+        armazenamento.atualizar(CARDAPIO_FILE, Cardapio.model_fields.keys(), cardapio_id, dados_atualizados.model_dump())
         logger.info(f"Item {cardapio_id} do cardapio atualizado com sucesso")
         return {"message": f"Item {cardapio_id} do cardapio atualizado com sucesso"}
     except HTTPException:
@@ -87,12 +78,10 @@ def remover_item_cardapio(cardapio_id) -> dict:
         if cardapio.size == 0:
             raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Nenhum item do cardapio cadastrado no banco")
         
-        item_cardapio = cardapio[cardapio["id"] == cardapio_id]
-        if item_cardapio.empty:
+        if cardapio_id not in armazenamento.posicoes_por_id(CARDAPIO_FILE, cardapio):
             raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Item do cardapio não encontrado")
         
-        cardapio = cardapio.drop(cardapio[cardapio["id"] == cardapio_id].index)
-        cardapio.to_csv(CARDAPIO_FILE, index=False)
+        armazenamento.remover(CARDAPIO_FILE, Cardapio.model_fields.keys(), cardapio_id)
         logger.info("Item do cardapio removido com sucesso")
         return {"id": cardapio_id, "message": "Item do cardapio removido com sucesso"}
     except HTTPException:
@@ -100,15 +89,64 @@ def remover_item_cardapio(cardapio_id) -> dict:
     except Exception as e:
         logger.error(f"Erro ao deletar o item do cardapio: {e}")
         raise RuntimeError(f"Erro ao deletar o item do cardapio: {e}")
+
+def processar_lote_cardapio(lote: CardapioLote) -> dict:
+    try:
+        cardapio = carregar_dados_csv()
+        posicoes = armazenamento.posicoes_por_id(CARDAPIO_FILE, cardapio)
+        resultados = []
+        operacoes = []
+
+        for item in lote.atualizar:
+            if item.id not in posicoes:
+                resultados.append({"operacao": "atualizar", "id": item.id, "status": HTTPStatus.NOT_FOUND, "message": "Item do cardapio não encontrado"})
+                continue
+            operacoes.append({"op": "atualizar", "id": item.id, "dados": item.model_dump()})
+            resultados.append({"operacao": "atualizar", "id": item.id, "status": HTTPStatus.OK, "message": f"Item {item.id} do cardapio atualizado com sucesso"})
+
+        for cardapio_id in lote.remover:
+            if cardapio_id not in posicoes:
+                resultados.append({"operacao": "remover", "id": cardapio_id, "status": HTTPStatus.NOT_FOUND, "message": "Item do cardapio não encontrado"})
+                continue
+            operacoes.append({"op": "remover", "id": cardapio_id})
+            resultados.append({"operacao": "remover", "id": cardapio_id, "status": HTTPStatus.OK, "message": "Item do cardapio removido com sucesso"})
+
+        novos = []
+        for item, novo_id in zip(lote.criar, armazenamento.reservar_ids(CARDAPIO_FILE, len(lote.criar))):
+            item.id = novo_id
+            novos.append(item.model_dump())
+            resultados.append({"operacao": "criar", "id": novo_id, "status": HTTPStatus.CREATED, "message": "Item do cardapio criado com sucesso"})
+
+        armazenamento.aplicar_lote(CARDAPIO_FILE, Cardapio.model_fields.keys(), novos, operacoes)
+        logger.info(f"Lote processado: {len(novos)} criados, {len(operacoes)} atualizados/removidos")
+        return {"resultados": resultados}
+    except Exception as e:
+        logger.error(f"Erro ao processar lote do cardapio: {e}")
+        raise RuntimeError(f"Erro ao processar lote do cardapio: {e}")
+    
+def importar_cardapio(arquivo: BinaryIO) -> dict:
+    try:
+        relatorio = importacao.importar(CARDAPIO_FILE, Cardapio, arquivo)
+        logger.info(f"Importação concluída: {relatorio['importados']} importados, {relatorio['rejeitados']} rejeitados")
+        return relatorio
+    except ValueError as e:
+        logger.error(f"CSV inválido na importação de itens do cardapio: {e}")
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro ao importar itens do cardapio: {e}")
+        raise RuntimeError(f"Erro ao importar itens do cardapio: {e}")
     
 def get_qtd_itens_cardapio() -> dict:
-    return csv_utils.get_quantidade_total(CARDAPIO_FILE)
+    return {"quantidade": armazenamento.contar(CARDAPIO_FILE)}
 
-def get_cardapio_zip() -> bytes:
-    return csv_utils.csv_to_zip(CARDAPIO_FILE)
+def get_cardapio_zip(compressao: str = "zip", nivel: int = config.NIVEL_COMPRESSAO) -> tuple[Iterator[bytes], str]:
+    try:
+        return exportacao.obter_zip(CARDAPIO_FILE, Cardapio.model_fields.keys(), compressao, nivel)
+    except ValueError as e:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
 
-def get_cardapio_sha256() -> str:
-    return csv_utils.get_sha256(CARDAPIO_FILE)
+def get_cardapio_sha256() -> tuple[str, str]:
+    return exportacao.obter_sha256(CARDAPIO_FILE, Cardapio.model_fields.keys())
 
-def get_cardapio_xml() -> str:
-    return csv_utils.csv_to_xml(CARDAPIO_FILE)
\ No newline at end of file
+def get_cardapio_xml() -> tuple[Iterator[bytes], str]:
+    return exportacao.obter_xml(CARDAPIO_FILE, Cardapio.model_fields.keys())
\ No newline at end of file
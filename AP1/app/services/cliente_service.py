@@ -1,36 +1,24 @@
-import os
 import pandas as pd
-from app.schemas.cliente_model import Cliente
+from typing import BinaryIO, Iterator
+from app.schemas.cliente_model import Cliente, ClienteLote
 from fastapi import HTTPException
 from http import HTTPStatus
 from app.utils.logger import get_logger
-from app.utils import csv_utils
+from app import config
+from app.utils import csv_utils, armazenamento, esquema, exportacao, importacao, paginacao, secundario
 
 CLIENTE_FILE = "app/data/cliente.csv"
 logger = get_logger("cliente")
+esquema.registrar(CLIENTE_FILE, Cliente)
+secundario.declarar(CLIENTE_FILE, Cliente, {"cpf": secundario.HASH, "email": secundario.HASH})
 
 def carregar_dados_csv() -> pd.DataFrame:
-    os.makedirs(os.path.dirname(CLIENTE_FILE), exist_ok=True)
-    
-    if os.path.exists(CLIENTE_FILE) and os.path.getsize(CLIENTE_FILE) > 0:
-        return pd.read_csv(CLIENTE_FILE, index_col=False)
-    
-    df_vazio = pd.DataFrame(columns=Cliente.model_fields.keys())
-    df_vazio.to_csv(CLIENTE_FILE, index=False)
-    return df_vazio
+    return armazenamento.carregar(CLIENTE_FILE, Cliente.model_fields.keys())
 
 def criar_cliente(cliente_item: Cliente) -> dict:
     try:
-        clientes = carregar_dados_csv()
-        novo_id = 0
-        if not clientes.empty and "id" in clientes.columns:
-            novo_id = int(clientes["id"].max()) + 1
-        
-        cliente_item.id = novo_id
-        novo_df = pd.DataFrame([cliente_item.model_dump()])
-
-        clientes = pd.concat([clientes, novo_df], ignore_index=True)
-        novo_df.to_csv(CLIENTE_FILE, mode="a", index=False, header=False)
+        cliente_item.id = armazenamento.proximo_id(CLIENTE_FILE)
+        armazenamento.anexar(CLIENTE_FILE, Cliente.model_fields.keys(), [cliente_item.model_dump()])
 
         logger.info("Cliente criado com sucesso")
         return {"id": cliente_item.id, "message": "Cliente criado com sucesso"}
@@ -38,22 +26,32 @@ def criar_cliente(cliente_item: Cliente) -> dict:
         logger.error(f"Erro ao criar cliente: {e}")
         raise RuntimeError(f"Erro ao criar cliente: {e}")
 
-def listar_clientes(**filtros) -> list[dict]:
-    df = carregar_dados_csv()
-    for campo, valor in filtros.items():
-        if valor:
-            if campo in df.columns:
-                df = df[df[campo].astype(str).str.contains(str(valor), case=False, na=False)]
-    return df.to_dict(orient="records")
+def _paginar(limit, offset, after_id, order_by, filtros) -> pd.DataFrame:
+    try:
+        return paginacao.paginar(CLIENTE_FILE, carregar_dados_csv(), Cliente, filtros, limit, offset, after_id, order_by)
+    except ValueError as e:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
+
+def listar_clientes(limit: int = None, offset: int = 0, after_id: int = None, order_by: str = None, **filtros) -> list[dict]:
+    return esquema.registros(CLIENTE_FILE, _paginar(limit, offset, after_id, order_by, filtros))
+
+def listar_clientes_stream(formato: str, limit: int = None, offset: int = 0, after_id: int = None, order_by: str = None, **filtros) -> Iterator[str]:
+    if order_by:
+        # Ordenar exige a tabela inteira; só a página já ordenada é fatiada.
+        blocos = csv_utils.fatiar(_paginar(limit, offset, after_id, order_by, filtros), config.TAMANHO_BLOCO)
+    else:
+        blocos = paginacao.paginar_blocos(
+            CLIENTE_FILE, armazenamento.ler_em_blocos(CLIENTE_FILE, Cliente.model_fields.keys(), Cliente, filtros), Cliente, filtros, limit, offset, after_id
+        )
+    return csv_utils.serializar_blocos((esquema.exibir(CLIENTE_FILE, bloco) for bloco in blocos), formato)
 
 def listar_cliente_id(cliente_id) -> dict:
     try:
-        clientes = carregar_dados_csv()
-        cliente = clientes[clientes["id"] == cliente_id]
-        if cliente.empty:
+        cliente = armazenamento.buscar_por_id(CLIENTE_FILE, Cliente.model_fields.keys(), cliente_id)
+        if cliente is None:
             raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Cliente não encontrado")
         else:
-            return cliente.iloc[0].to_dict()
+            return cliente
     except HTTPException:
         raise
     except Exception as e:
@@ -63,16 +61,10 @@ def listar_cliente_id(cliente_id) -> dict:
 def atualizar_cliente(cliente_id: int, dados_atualizados: Cliente) -> dict:
     try:
         clientes = carregar_dados_csv()
-        indice = clientes[clientes["id"] == cliente_id].index
-
-        if indice.empty:
+        if cliente_id not in armazenamento.posicoes_por_id(CLIENTE_FILE, clientes):
             raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Cliente não encontrado")
 
-        dados_dict = dados_atualizados.model_dump()
-        dados_dict["id"] = cliente_id
-
-        clientes.loc[indice[0]] = dados_dict
-        clientes.to_csv(CLIENTE_FILE, index=False)
+        armazenamento.atualizar(CLIENTE_FILE, Cliente.model_fields.keys(), cliente_id, dados_atualizados.model_dump())
         logger.info(f"Cliente {cliente_id} atualizado com sucesso")
         return {"message": f"Cliente {cliente_id} atualizado com sucesso"}
     except HTTPException:
@@ -87,12 +79,10 @@ def remover_cliente(cliente_id) -> dict:
         if clientes.size == 0:
             raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Nenhum cliente cadastrado no banco")
         
-        cliente = clientes[clientes["id"] == cliente_id]
-        if cliente.empty:
+        if cliente_id not in armazenamento.posicoes_por_id(CLIENTE_FILE, clientes):
             raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Cliente não encontrado")
         
-        clientes = clientes.drop(clientes[clientes["id"] == cliente_id].index)
-        clientes.to_csv(CLIENTE_FILE, index=False)
+        armazenamento.remover(CLIENTE_FILE, Cliente.model_fields.keys(), cliente_id)
         logger.info("Cliente removido com sucesso")
         return {"id": cliente_id, "message": "Cliente removido com sucesso"}
     except HTTPException:
@@ -100,15 +90,64 @@ def remover_cliente(cliente_id) -> dict:
     except Exception as e:
         logger.error(f"Erro ao deletar o cliente: {e}")
         raise RuntimeError(f"Erro ao deletar o cliente: {e}")
+
+def processar_lote_clientes(lote: ClienteLote) -> dict:
+    try:
+        clientes = carregar_dados_csv()
+        posicoes = armazenamento.posicoes_por_id(CLIENTE_FILE, clientes)
+        resultados = []
+        operacoes = []
+
+        for cliente in lote.atualizar:
+            if cliente.id not in posicoes:
+                resultados.append({"operacao": "atualizar", "id": cliente.id, "status": HTTPStatus.NOT_FOUND, "message": "Cliente não encontrado"})
+                continue
+            operacoes.append({"op": "atualizar", "id": cliente.id, "dados": cliente.model_dump()})
+            resultados.append({"operacao": "atualizar", "id": cliente.id, "status": HTTPStatus.OK, "message": f"Cliente {cliente.id} atualizado com sucesso"})
+
+        for cliente_id in lote.remover:
+            if cliente_id not in posicoes:
+                resultados.append({"operacao": "remover", "id": cliente_id, "status": HTTPStatus.NOT_FOUND, "message": "Cliente não encontrado"})
+                continue
+            operacoes.append({"op": "remover", "id": cliente_id})
+            resultados.append({"operacao": "remover", "id": cliente_id, "status": HTTPStatus.OK, "message": "Cliente removido com sucesso"})
+
+        novos = []
+        for cliente, novo_id in zip(lote.criar, armazenamento.reservar_ids(CLIENTE_FILE, len(lote.criar))):
+            cliente.id = novo_id
+            novos.append(cliente.model_dump())
+            resultados.append({"operacao": "criar", "id": novo_id, "status": HTTPStatus.CREATED, "message": "Cliente criado com sucesso"})
+
+        armazenamento.aplicar_lote(CLIENTE_FILE, Cliente.model_fields.keys(), novos, operacoes)
+        logger.info(f"Lote processado: {len(novos)} criados, {len(operacoes)} atualizados/removidos")
+        return {"resultados": resultados}
+    except Exception as e:
+        logger.error(f"Erro ao processar lote de clientes: {e}")
+        raise RuntimeError(f"Erro ao processar lote de clientes: {e}")
+    
+def importar_clientes(arquivo: BinaryIO) -> dict:
+    try:
+        relatorio = importacao.importar(CLIENTE_FILE, Cliente, arquivo)
+        logger.info(f"Importação concluída: {relatorio['importados']} importados, {relatorio['rejeitados']} rejeitados")
+        return relatorio
+    except ValueError as e:
+        logger.error(f"CSV inválido na importação de clientes: {e}")
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro ao importar clientes: {e}")
+        raise RuntimeError(f"Erro ao importar clientes: {e}")
     
 def get_qtd_clientes() -> dict:
-    return csv_utils.get_quantidade_total(CLIENTE_FILE)
+    return {"quantidade": armazenamento.contar(CLIENTE_FILE)}
 
-def get_cliente_zip() -> bytes:
-    return csv_utils.csv_to_zip(CLIENTE_FILE)
+def get_cliente_zip(compressao: str = "zip", nivel: int = config.NIVEL_COMPRESSAO) -> tuple[Iterator[bytes], str]:
+    try:
+        return exportacao.obter_zip(CLIENTE_FILE, Cliente.model_fields.keys(), compressao, nivel)
+    except ValueError as e:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
 
-def get_cliente_sha256() -> str:
-    return csv_utils.get_sha256(CLIENTE_FILE)
+def get_cliente_sha256() -> tuple[str, str]:
+    return exportacao.obter_sha256(CLIENTE_FILE, Cliente.model_fields.keys())
 
-def get_cliente_xml() -> str:
-    return csv_utils.csv_to_xml(CLIENTE_FILE)
\ No newline at end of file
+def get_cliente_xml() -> tuple[Iterator[bytes], str]:
+    return exportacao.obter_xml(CLIENTE_FILE, Cliente.model_fields.keys())
\ No newline at end of file
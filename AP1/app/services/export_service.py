@@ -0,0 +1,18 @@
+from typing import Iterator
+from app import config
+from app.schemas.cardapio_model import Cardapio
+from app.schemas.cliente_model import Cliente
+from app.schemas.pedido_model import Pedido
+from app.utils import exportacao
+from app.services.cardapio_service import CARDAPIO_FILE
+from app.services.cliente_service import CLIENTE_FILE
+from app.services.pedido_service import PEDIDO_FILE
+
+TABELAS = {
+    CLIENTE_FILE: Cliente.model_fields.keys(),
+    CARDAPIO_FILE: Cardapio.model_fields.keys(),
+    PEDIDO_FILE: Pedido.model_fields.keys(),
+}
+
+def get_snapshot(nivel: int = config.NIVEL_COMPRESSAO) -> tuple[Iterator[bytes], str]:
+    return exportacao.obter_snapshot(TABELAS, nivel)
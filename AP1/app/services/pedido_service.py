@@ -1,48 +1,47 @@
-import os
 import pandas as pd
-from app.schemas.pedido_model import Pedido
+from typing import BinaryIO, Iterator
+from app.schemas.pedido_model import Pedido, PedidoLote
 from fastapi import HTTPException
 from http import HTTPStatus
-from app.utils import csv_utils
+from app import config
+from app.utils import csv_utils, armazenamento, esquema, exportacao, importacao, paginacao, secundario
 from app.utils.logger import get_logger
-from app.services.cliente_service import carregar_dados_csv as carregar_clientes
-from app.services.cardapio_service import carregar_dados_csv as carregar_cardapio
+from app.services.cliente_service import CLIENTE_FILE
+from app.services.cardapio_service import CARDAPIO_FILE
 
 PEDIDO_FILE = "app/data/pedido.csv"
 logger = get_logger("pedido")
+esquema.registrar(PEDIDO_FILE, Pedido)
+secundario.declarar(PEDIDO_FILE, Pedido, {"cliente_id": secundario.HASH, "status": secundario.HASH, "data_hora_pedido": secundario.ORDENADO})
 
 def carregar_dados_csv() -> pd.DataFrame:
-    os.makedirs(os.path.dirname(PEDIDO_FILE), exist_ok=True)
-    
-    if os.path.exists(PEDIDO_FILE) and os.path.getsize(PEDIDO_FILE) > 0:
-        return pd.read_csv(PEDIDO_FILE, index_col=False)
-    
-    df_vazio = pd.DataFrame(columns=Pedido.model_fields.keys())
-    df_vazio.to_csv(PEDIDO_FILE, index=False)
-    return df_vazio
+    return armazenamento.carregar(PEDIDO_FILE, Pedido.model_fields.keys())
+
+def _validar_referencias(pedido_item: Pedido, ids_clientes: frozenset, ids_cardapio: frozenset) -> str | None:
+    # Uma diferença de conjuntos para todos os itens; a mensagem lista todos
+    # os ids que faltam, não só o primeiro.
+    erros = []
+    if pedido_item.cliente_id not in ids_clientes:
+        erros.append(f"ID {pedido_item.cliente_id} de cliente inválido")
+    faltando = set(pedido_item.itens) - ids_cardapio
+    if len(faltando) == 1:
+        erros.append(f"Não foi possível encontrar o ID {faltando.pop()} no cardapio")
+    elif faltando:
+        ids = ", ".join(str(id) for id in dict.fromkeys(pedido_item.itens) if id in faltando)
+        erros.append(f"Não foi possível encontrar os IDs {ids} no cardapio")
+    return "; ".join(erros) or None
 
 def criar_pedido(pedido_item: Pedido) -> dict:
     try:
-        clientes = carregar_clientes()
-        cardapio = carregar_cardapio()
-        if clientes[clientes["id"] == pedido_item.cliente_id].empty:
-            logger.error(f"ID {pedido_item.cliente_id} de cliente inválido")
-            raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=f"ID {pedido_item.cliente_id} de cliente inválido")
-        for id in pedido_item.itens:
-            if cardapio[cardapio["id"] == id].empty:
-                logger.error(f"Não foi possível encontrar o ID {id} no cardapio")
-                raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=f"Não foi possível encontrar o ID {id} no cardapio")
-
-        pedidos = carregar_dados_csv()
-        novo_id = 0
-        if not pedidos.empty and "id" in pedidos.columns:
-            novo_id = int(pedidos["id"].max()) + 1
-        
-        pedido_item.id = novo_id
-        novo_df = pd.DataFrame([pedido_item.model_dump()])
+        erro = _validar_referencias(
+            pedido_item, armazenamento.conjunto_ids(CLIENTE_FILE), armazenamento.conjunto_ids(CARDAPIO_FILE)
+        )
+        if erro:
+            logger.error(erro)
+            raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=erro)
 
-        pedidos = pd.concat([pedidos, novo_df], ignore_index=True)
-        novo_df.to_csv(PEDIDO_FILE, mode="a", index=False, header=False)
+        pedido_item.id = armazenamento.proximo_id(PEDIDO_FILE)
+        armazenamento.anexar(PEDIDO_FILE, Pedido.model_fields.keys(), [pedido_item.model_dump()])
 
         logger.info("Pedido criado com sucesso")
         return {"id": pedido_item.id, "message": "Pedido criado com sucesso"}
@@ -52,22 +51,32 @@ def criar_pedido(pedido_item: Pedido) -> dict:
         logger.error(f"Erro ao criar pedido: {e}")
         raise RuntimeError(f"Erro ao criar pedido: {e}")
     
-def listar_pedidos(**filtros) -> list[dict]:
-    df = carregar_dados_csv()
-    for campo, valor in filtros.items():
-        if valor:
-            if campo in df.columns:
-                df = df[df[campo].astype(str).str.contains(str(valor), case=False, na=False)]
-    return df.to_dict(orient="records")
+def _paginar(limit, offset, after_id, order_by, filtros) -> pd.DataFrame:
+    try:
+        return paginacao.paginar(PEDIDO_FILE, carregar_dados_csv(), Pedido, filtros, limit, offset, after_id, order_by)
+    except ValueError as e:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
+
+def listar_pedidos(limit: int = None, offset: int = 0, after_id: int = None, order_by: str = None, **filtros) -> list[dict]:
+    return esquema.registros(PEDIDO_FILE, _paginar(limit, offset, after_id, order_by, filtros))
+
+def listar_pedidos_stream(formato: str, limit: int = None, offset: int = 0, after_id: int = None, order_by: str = None, **filtros) -> Iterator[str]:
+    if order_by:
+        # Ordenar exige a tabela inteira; só a página já ordenada é fatiada.
+        blocos = csv_utils.fatiar(_paginar(limit, offset, after_id, order_by, filtros), config.TAMANHO_BLOCO)
+    else:
+        blocos = paginacao.paginar_blocos(
+            PEDIDO_FILE, armazenamento.ler_em_blocos(PEDIDO_FILE, Pedido.model_fields.keys(), Pedido, filtros), Pedido, filtros, limit, offset, after_id
+        )
+    return csv_utils.serializar_blocos((esquema.exibir(PEDIDO_FILE, bloco) for bloco in blocos), formato)
 
 def listar_pedido_id(pedido_id) -> dict:
     try:
-        pedidos = carregar_dados_csv()
-        pedido = pedidos[pedidos["id"] == pedido_id]
-        if pedido.empty:
+        pedido = armazenamento.buscar_por_id(PEDIDO_FILE, Pedido.model_fields.keys(), pedido_id)
+        if pedido is None:
             raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Pedido não encontrado")
         else:
-            return pedido.iloc[0].to_dict()
+            return pedido
     except HTTPException:
         raise
     except Exception as e:
@@ -77,16 +86,10 @@ def listar_pedido_id(pedido_id) -> dict:
 def atualizar_pedido(pedido_id: int, dados_atualizados: Pedido) -> dict:
     try:
         pedidos = carregar_dados_csv()
-        indice = pedidos[pedidos["id"] == pedido_id].index
-
-        if indice.empty:
+        if pedido_id not in armazenamento.posicoes_por_id(PEDIDO_FILE, pedidos):
             raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Pedido não encontrado")
 
-        dados_dict = dados_atualizados.model_dump()
-        dados_dict["id"] = pedido_id
-
-        pedidos.loc[indice[0]] = dados_dict
-        pedidos.to_csv(PEDIDO_FILE, index=False)
+        armazenamento.atualizar(PEDIDO_FILE, Pedido.model_fields.keys(), pedido_id, dados_atualizados.model_dump())
         logger.info(f"Pedido {pedido_id} atualizado com sucesso")
         return {"message": f"Pedido {pedido_id} atualizado com sucesso"}
     except HTTPException:
@@ -101,12 +104,10 @@ def remover_pedido(pedido_id) -> dict:
         if pedidos.size == 0:
             raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Nenhum pedido cadastrado no banco")
         
-        pedido = pedidos[pedidos["id"] == pedido_id]
-        if pedido.empty:
+        if pedido_id not in armazenamento.posicoes_por_id(PEDIDO_FILE, pedidos):
             raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Pedido não encontrado")
         
-        pedidos = pedidos.drop(pedidos[pedidos["id"] == pedido_id].index)
-        pedidos.to_csv(PEDIDO_FILE, index=False)
+        armazenamento.remover(PEDIDO_FILE, Pedido.model_fields.keys(), pedido_id)
         logger.info("Pedido removido com sucesso")
         return {"id": pedido_id, "message": "Pedido removido com sucesso"}
     except HTTPException:
@@ -114,15 +115,81 @@ def remover_pedido(pedido_id) -> dict:
     except Exception as e:
         logger.error(f"Erro ao deletar o pedido: {e}")
         raise RuntimeError(f"Erro ao deletar o pedido: {e}")
+
+def processar_lote_pedidos(lote: PedidoLote) -> dict:
+    try:
+        ids_clientes = armazenamento.conjunto_ids(CLIENTE_FILE)
+        ids_cardapio = armazenamento.conjunto_ids(CARDAPIO_FILE)
+        pedidos = carregar_dados_csv()
+        posicoes = armazenamento.posicoes_por_id(PEDIDO_FILE, pedidos)
+        resultados = []
+        operacoes = []
+
+        for pedido in lote.atualizar:
+            if pedido.id not in posicoes:
+                resultados.append({"operacao": "atualizar", "id": pedido.id, "status": HTTPStatus.NOT_FOUND, "message": "Pedido não encontrado"})
+                continue
+            erro = _validar_referencias(pedido, ids_clientes, ids_cardapio)
+            if erro:
+                resultados.append({"operacao": "atualizar", "id": pedido.id, "status": HTTPStatus.NOT_FOUND, "message": erro})
+                continue
+            operacoes.append({"op": "atualizar", "id": pedido.id, "dados": pedido.model_dump()})
+            resultados.append({"operacao": "atualizar", "id": pedido.id, "status": HTTPStatus.OK, "message": f"Pedido {pedido.id} atualizado com sucesso"})
+
+        for pedido_id in lote.remover:
+            if pedido_id not in posicoes:
+                resultados.append({"operacao": "remover", "id": pedido_id, "status": HTTPStatus.NOT_FOUND, "message": "Pedido não encontrado"})
+                continue
+            operacoes.append({"op": "remover", "id": pedido_id})
+            resultados.append({"operacao": "remover", "id": pedido_id, "status": HTTPStatus.OK, "message": "Pedido removido com sucesso"})
+
+        novos = []
+        validos = []
+        for pedido in lote.criar:
+            erro = _validar_referencias(pedido, ids_clientes, ids_cardapio)
+            if erro:
+                resultados.append({"operacao": "criar", "id": None, "status": HTTPStatus.NOT_FOUND, "message": erro})
+                continue
+            validos.append(pedido)
+        for pedido, novo_id in zip(validos, armazenamento.reservar_ids(PEDIDO_FILE, len(validos))):
+            pedido.id = novo_id
+            novos.append(pedido.model_dump())
+            resultados.append({"operacao": "criar", "id": novo_id, "status": HTTPStatus.CREATED, "message": "Pedido criado com sucesso"})
+
+        armazenamento.aplicar_lote(PEDIDO_FILE, Pedido.model_fields.keys(), novos, operacoes)
+        logger.info(f"Lote processado: {len(novos)} criados, {len(operacoes)} atualizados/removidos")
+        return {"resultados": resultados}
+    except Exception as e:
+        logger.error(f"Erro ao processar lote de pedidos: {e}")
+        raise RuntimeError(f"Erro ao processar lote de pedidos: {e}")
+    
+def importar_pedidos(arquivo: BinaryIO) -> dict:
+    try:
+        ids_clientes = armazenamento.conjunto_ids(CLIENTE_FILE)
+        ids_cardapio = armazenamento.conjunto_ids(CARDAPIO_FILE)
+        relatorio = importacao.importar(
+            PEDIDO_FILE, Pedido, arquivo, lambda pedido: _validar_referencias(pedido, ids_clientes, ids_cardapio)
+        )
+        logger.info(f"Importação concluída: {relatorio['importados']} importados, {relatorio['rejeitados']} rejeitados")
+        return relatorio
+    except ValueError as e:
+        logger.error(f"CSV inválido na importação de pedidos: {e}")
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro ao importar pedidos: {e}")
+        raise RuntimeError(f"Erro ao importar pedidos: {e}")
     
 def get_qtd_pedidos() -> dict:
-    return csv_utils.get_quantidade_total(PEDIDO_FILE)
+    return {"quantidade": armazenamento.contar(PEDIDO_FILE)}
 
-def get_pedido_zip() -> bytes:
-    return csv_utils.csv_to_zip(PEDIDO_FILE)
+def get_pedido_zip(compressao: str = "zip", nivel: int = config.NIVEL_COMPRESSAO) -> tuple[Iterator[bytes], str]:
+    try:
+        return exportacao.obter_zip(PEDIDO_FILE, Pedido.model_fields.keys(), compressao, nivel)
+    except ValueError as e:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
 
-def get_pedido_sha256() -> str:
-    return csv_utils.get_sha256(PEDIDO_FILE)
+def get_pedido_sha256() -> tuple[str, str]:
+    return exportacao.obter_sha256(PEDIDO_FILE, Pedido.model_fields.keys())
 
-def get_pedido_xml() -> str:
-    return csv_utils.csv_to_xml(PEDIDO_FILE)
\ No newline at end of file
+def get_pedido_xml() -> tuple[Iterator[bytes], str]:
+    return exportacao.obter_xml(PEDIDO_FILE, Pedido.model_fields.keys())
\ No newline at end of file
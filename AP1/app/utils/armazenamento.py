@@ -0,0 +1,443 @@
+import csv
+import io
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from typing import Callable, Iterable, Iterator
+from pydantic import BaseModel
+from app import config
+from app.utils import cache, colunar, csv_utils, esquema, indice, journal, lock, metadados, secundario
+from app.utils.logger import get_logger
+
+logger = get_logger("armazenamento")
+_INDICE_DESATUALIZADO = object()
+_lock_ids = threading.Lock()
+_ids: dict[str, tuple[list, frozenset]] = {}
+
+def modo_journal() -> bool:
+    # Os formatos colunares não aceitam append, então sempre usam o journal.
+    return config.MODO_ARMAZENAMENTO == "journal" or colunar.ativo()
+
+def _dependencias(caminho: str) -> tuple[str, ...]:
+    if colunar.ativo():
+        return (colunar.caminho_dados(caminho), journal.caminho_journal(caminho))
+    return (journal.caminho_journal(caminho),)
+
+def _normalizador(caminho: str) -> Callable[[pd.DataFrame], pd.DataFrame]:
+    # Linhas vindas do journal ou de inclusões passam pelo mesmo caminho de
+    # tipos que as lidas do disco.
+    return lambda df: esquema.tipar(caminho, csv_utils.normalizar_tipos(df, esquema.dtypes_leitura(caminho)))
+
+def _aplicar_journal(caminho: str, df: pd.DataFrame, operacoes: list[dict], incluir_novos: bool = True) -> pd.DataFrame:
+    return journal.aplicar(df, operacoes, incluir_novos, _normalizador(caminho))
+
+def _ler_base(caminho: str, colunas: list[str] | None = None) -> pd.DataFrame:
+    if colunar.ativo():
+        df = colunar.ler(caminho, colunas)
+    else:
+        df = pd.read_csv(caminho, index_col=False, usecols=colunas, dtype=esquema.dtypes_leitura(caminho))
+    return esquema.tipar(caminho, df)
+
+def _escrever_base(df: pd.DataFrame, caminho: str) -> None:
+    metadados.marcar_reescrita(caminho)
+    if colunar.ativo():
+        colunar.escrever(df, caminho)
+        indice.invalidar(caminho)
+    else:
+        csv_utils.escrever_atomico(esquema.exibir(caminho, df), caminho)
+        # O índice de posições sai junto, a partir dos ids já conhecidos, em
+        # vez de ser apagado e reconstruído pela próxima leitura fria.
+        indice.escrever(caminho, df["id"].to_numpy(dtype="int64"))
+
+def _ler_do_disco(caminho: str) -> pd.DataFrame:
+    df = _ler_base(caminho)
+    if modo_journal():
+        df = _aplicar_journal(caminho, df, journal.ler_operacoes(caminho))
+    return df
+
+def _existe(caminho: str) -> bool:
+    dados = colunar.caminho_dados(caminho)
+    return os.path.exists(dados) and os.path.getsize(dados) > 0
+
+def assinatura(caminho: str) -> list:
+    # Assinatura (inode, tamanho, mtime) dos arquivos da tabela, em formato
+    # que pode ser guardado no sidecar .meta.
+    return [list(a) if a else None for a in cache.assinatura_tabela(caminho, _dependencias(caminho))]
+
+def _registrar_linhas(caminho: str, antes: list, total: int | None = None, delta: int | None = None) -> None:
+    # Mantém a contagem do sidecar: um total conhecido substitui o valor; um
+    # delta só vale se a contagem correspondia aos arquivos antes da escrita.
+    # Sem nenhum dos dois a contagem é descartada e refeita na próxima leitura.
+    with metadados.editar(caminho) as meta:
+        linhas = meta.get("linhas")
+        if total is None and delta is not None and linhas is not None and linhas["assinatura"] == antes:
+            total = linhas["valor"] + delta
+        if total is None:
+            meta.pop("linhas", None)
+        else:
+            meta["linhas"] = {"valor": total, "assinatura": assinatura(caminho)}
+
+def _criar_vazio(caminho: str, colunas: Iterable[str]) -> pd.DataFrame:
+    with lock.escrita(caminho):
+        if _existe(caminho):
+            return carregar(caminho, colunas)
+        antes = assinatura(caminho)
+        df_vazio = esquema.tipar(caminho, pd.DataFrame(columns=list(colunas)))
+        _escrever_base(df_vazio, caminho)
+        cache.atualizar_tabela(caminho, df_vazio, *_dependencias(caminho))
+        _registrar_linhas(caminho, antes, total=0)
+        return df_vazio
+
+def garantir_arquivo(caminho: str, colunas: Iterable[str]) -> None:
+    if not _existe(caminho):
+        _criar_vazio(caminho, colunas)
+
+def carregar(caminho: str, colunas: Iterable[str]) -> pd.DataFrame:
+    if not _existe(caminho):
+        return _criar_vazio(caminho, colunas)
+    df = cache.tabela_em_cache(caminho, *_dependencias(caminho))
+    if df is not None:
+        return df
+    # A assinatura e o parse acontecem com o lock de leitura, então nunca
+    # pegam um append ou uma compactação pela metade.
+    with lock.leitura(caminho):
+        return cache.obter_tabela(caminho, lambda: _ler_do_disco(caminho), *_dependencias(caminho))
+
+def ler_colunas(caminho: str, colunas: list[str]) -> pd.DataFrame:
+    # Projeção: com o cache frio só as colunas pedidas são lidas do disco.
+    df = cache.tabela_em_cache(caminho, *_dependencias(caminho))
+    if df is None:
+        if not _existe(caminho):
+            return pd.DataFrame(columns=colunas)
+        with lock.leitura(caminho):
+            df = _ler_base(caminho, colunas if "id" in colunas else ["id", *colunas])
+            if modo_journal():
+                df = _aplicar_journal(caminho, df, journal.ler_operacoes(caminho))
+    return df[colunas]
+
+def _blocos_csv(caminho: str, arquivo: io.BufferedReader) -> Iterator[pd.DataFrame]:
+    dtypes = esquema.dtypes_leitura(caminho)
+    with arquivo, pd.read_csv(arquivo, index_col=False, chunksize=config.TAMANHO_BLOCO, dtype=dtypes) as leitor:
+        yield from leitor
+
+def ler_em_blocos(caminho: str, colunas: Iterable[str], modelo: type[BaseModel] = None, filtros: dict = None) -> Iterator[pd.DataFrame]:
+    # Memória limitada ao tamanho do bloco: com o cache quente a tabela já
+    # está em memória e é só fatiada; fria, o arquivo é lido em pedaços. Nos
+    # formatos colunares os filtros viram um pré-filtro na própria leitura.
+    if not _existe(caminho):
+        yield _criar_vazio(caminho, colunas)
+        return
+
+    df = cache.tabela_em_cache(caminho, *_dependencias(caminho))
+    if df is not None:
+        yield from csv_utils.fatiar(df, config.TAMANHO_BLOCO)
+        return
+
+    # O lock só é mantido para abrir o snapshot; o streaming segue sem
+    # bloquear escritores.
+    with lock.leitura(caminho):
+        operacoes = journal.ler_operacoes(caminho) if modo_journal() else []
+        if colunar.ativo():
+            fragmento = colunar.abrir(caminho)
+        else:
+            arquivo = csv_utils.abrir_snapshot(caminho)
+
+    if colunar.ativo():
+        filtro = None
+        if modelo is not None and filtros:
+            filtro = colunar.expressao(modelo, filtros, {op["id"] for op in operacoes})
+        blocos = colunar.ler_em_blocos(fragmento, config.TAMANHO_BLOCO, filtro)
+    else:
+        blocos = _blocos_csv(caminho, arquivo)
+
+    vazio = True
+    for bloco in blocos:
+        vazio = False
+        yield _aplicar_journal(caminho, esquema.tipar(caminho, bloco), operacoes, incluir_novos=False)
+    # Linhas inseridas pelo journal (formatos colunares) vêm num bloco final.
+    inseridos = pd.DataFrame(columns=list(colunas))
+    if any(op["op"] == "inserir" for op in operacoes):
+        inseridos = _aplicar_journal(caminho, inseridos, operacoes)
+    if vazio or not inseridos.empty:
+        yield inseridos
+
+class _PosicoesOrdenadas:
+    # id -> posição por busca binária na própria coluna id. Os ids vêm da
+    # sequência e o journal preserva a ordem das linhas, então a coluna
+    # segue crescente e não há dicionário a reconstruir a cada escrita.
+    def __init__(self, ids: np.ndarray):
+        self._ids = ids
+
+    def get(self, registro_id: int, padrao: int | None = None) -> int | None:
+        posicao = int(np.searchsorted(self._ids, registro_id))
+        if posicao < len(self._ids) and self._ids[posicao] == registro_id:
+            return posicao
+        return padrao
+
+    def __contains__(self, registro_id: int) -> bool:
+        return self.get(registro_id) is not None
+
+def _posicoes(df: pd.DataFrame) -> _PosicoesOrdenadas | dict[int, int]:
+    ids = df["id"].to_numpy(dtype="int64")
+    if len(ids) < 2 or (ids[1:] > ids[:-1]).all():
+        return _PosicoesOrdenadas(ids)
+    return {int(i): p for p, i in enumerate(ids.tolist())}
+
+def posicoes_por_id(caminho: str, df: pd.DataFrame) -> _PosicoesOrdenadas | dict[int, int]:
+    return cache.obter_derivado(caminho, df, "posicoes_por_id", _posicoes)
+
+def conjunto_ids(caminho: str) -> frozenset[int]:
+    # Para checar referências sem carregar a tabela: com o cache quente o
+    # conjunto é derivado do DataFrame; frio, só a coluna id é lida e o
+    # conjunto vale enquanto a assinatura dos arquivos não mudar, inclusive
+    # por escritas de outros processos.
+    df = cache.tabela_em_cache(caminho, *_dependencias(caminho))
+    if df is not None:
+        return cache.obter_derivado(caminho, df, "ids", lambda d: frozenset(int(i) for i in d["id"].tolist()))
+
+    atual = assinatura(caminho)
+    with _lock_ids:
+        salvo = _ids.get(caminho)
+    if salvo is not None and salvo[0] == atual:
+        return salvo[1]
+    ids = frozenset(int(i) for i in ler_colunas(caminho, ["id"])["id"].tolist())
+    with _lock_ids:
+        _ids[caminho] = (atual, ids)
+    return ids
+
+def _ler_registro_no_disco(caminho: str, colunas: list[str], registro_id: int) -> dict | bytes | None:
+    # Devolve o registro já resolvido pelo journal (dict), os bytes da linha
+    # no CSV, None se não existe ou _INDICE_DESATUALIZADO.
+    if modo_journal():
+        ultima = None
+        for op in journal.ler_operacoes(caminho):
+            if op["id"] == registro_id:
+                ultima = op
+        if ultima is not None:
+            if ultima["op"] == "remover":
+                return None
+            return _normalizador(caminho)(pd.DataFrame([ultima["dados"]], columns=colunas)).iloc[0].to_dict()
+
+    if colunar.ativo():
+        registro = colunar.ler_por_id(caminho, registro_id)
+        return None if registro is None else esquema.tipar(caminho, pd.DataFrame([registro])).iloc[0].to_dict()
+
+    lido = indice.ler_se_atual(caminho)
+    if lido is None:
+        return _INDICE_DESATUALIZADO
+    registro = indice.ler_registro(caminho, lido, registro_id)
+    if registro is None:
+        return None
+    return indice.ler_cabecalho(caminho) + registro
+
+def _buscar_no_disco(caminho: str, colunas: list[str], registro_id: int) -> dict | None:
+    with lock.leitura(caminho):
+        resultado = _ler_registro_no_disco(caminho, colunas, registro_id)
+    if resultado is _INDICE_DESATUALIZADO:
+        # Índice ausente ou atrás do CSV: só quem tem o lock de escrita o corrige.
+        with lock.escrita(caminho):
+            indice.sincronizar(caminho)
+            resultado = _ler_registro_no_disco(caminho, colunas, registro_id)
+
+    if resultado is None or isinstance(resultado, dict):
+        return resultado
+    return esquema.tipar_registro(caminho, csv_utils.ler_registro(resultado, esquema.colunas_texto(caminho)))
+
+def buscar_por_id(caminho: str, colunas: Iterable[str], registro_id: int) -> dict | None:
+    # Com o cache quente a busca é um acesso ao dicionário id -> posição;
+    # frio, lê só o registro a partir do offset guardado no índice em disco
+    # (ou com o filtro por id empurrado para a leitura, nos formatos colunares).
+    df = cache.tabela_em_cache(caminho, *_dependencias(caminho))
+    if df is None:
+        if not _existe(caminho):
+            _criar_vazio(caminho, colunas)
+            return None
+        registro = _buscar_no_disco(caminho, list(colunas), registro_id)
+        return None if registro is None else esquema.exibir_registro(caminho, registro)
+
+    posicao = posicoes_por_id(caminho, df).get(registro_id)
+    if posicao is None:
+        return None
+    return esquema.exibir_registro(caminho, df.iloc[posicao].to_dict())
+
+def _maior_id(caminho: str) -> int:
+    if not _existe(caminho):
+        return -1
+    df = ler_colunas(caminho, ["id"])
+    maior = int(df["id"].max()) if not df.empty else -1
+    # Ids inseridos e depois removidos só aparecem no journal.
+    if modo_journal():
+        maior = max([maior, *(int(op["id"]) for op in journal.ler_operacoes(caminho))])
+    return maior
+
+def reservar_ids(caminho: str, quantidade: int) -> range:
+    # A sequência fica no sidecar .meta; o arquivo de dados só é lido na
+    # primeira vez, para continuar a partir do maior id já gravado.
+    return metadados.reservar_ids(caminho, quantidade, lambda: _maior_id(caminho) + 1)
+
+def proximo_id(caminho: str) -> int:
+    return reservar_ids(caminho, 1)[0]
+
+def aplicar_lote(caminho: str, colunas: Iterable[str], registros: list[dict], operacoes: list[dict]) -> None:
+    # Uma única escrita por lote: só inclusões viram um append; no modo csv
+    # atualizações/remoções reescrevem o arquivo uma vez e no modo journal
+    # viram um único append no journal.
+    colunas = list(colunas)
+    so_inclusoes = not operacoes
+    novo_df = None
+    if colunar.ativo():
+        # Arquivos colunares não aceitam append: inclusões também vão para o journal.
+        operacoes = [{"op": "inserir", "id": r["id"], "dados": r} for r in registros] + operacoes
+    elif registros:
+        novo_df = _normalizador(caminho)(pd.DataFrame(registros, columns=colunas))
+
+    afetados = {r["id"] for r in registros} | {op["id"] for op in operacoes}
+    with lock.escrita(caminho):
+        if not _existe(caminho):
+            _criar_vazio(caminho, colunas)
+        antes = assinatura(caminho)
+
+        if operacoes and not modo_journal():
+            antigo = carregar(caminho, colunas)
+            df = _aplicar_journal(caminho, antigo, operacoes)
+            if novo_df is not None:
+                df = pd.concat([df, novo_df], ignore_index=True)
+            derivados = secundario.manter(caminho, antigo, df, afetados)
+            _escrever_base(df, caminho)
+            cache.atualizar_tabela(caminho, df, *_dependencias(caminho), derivados=derivados)
+            _registrar_linhas(caminho, antes, total=len(df))
+            return
+
+        antigo = cache.tabela_em_cache(caminho, *_dependencias(caminho))
+        if operacoes:
+            journal.registrar(caminho, operacoes)
+        if novo_df is not None:
+            esquema.exibir(caminho, novo_df).to_csv(caminho, mode="a", index=False, header=False)
+            if os.path.exists(indice.caminho_indice(caminho)):
+                indice.sincronizar(caminho)
+        # Com o cache frio não há o que atualizar: a próxima leitura recarrega.
+        if antigo is not None:
+            df = _aplicar_journal(caminho, antigo, operacoes)
+            if novo_df is not None:
+                df = pd.concat([df, novo_df], ignore_index=True)
+            cache.atualizar_tabela(caminho, df, *_dependencias(caminho), derivados=secundario.manter(caminho, antigo, df, afetados))
+            _registrar_linhas(caminho, antes, total=len(df))
+        else:
+            # Remoções com o cache frio não dizem quantas linhas existiam.
+            _registrar_linhas(caminho, antes, delta=len(registros) if so_inclusoes else None)
+
+def anexar(caminho: str, colunas: Iterable[str], registros: list[dict]) -> None:
+    aplicar_lote(caminho, colunas, registros, [])
+
+def importar(caminho: str, colunas: Iterable[str], blocos: Iterable[list[dict]]) -> int:
+    # Para importações grandes: os registros chegam em blocos e vão para um
+    # temporário (linhas do CSV ou, nos formatos colunares, inclusões do
+    # journal); só a cópia dele para a tabela acontece com o lock de escrita,
+    # num único append. O cache não é atualizado: a assinatura muda e a
+    # próxima leitura recarrega a tabela.
+    colunas = list(colunas)
+    garantir_arquivo(caminho, colunas)
+    destino = journal.caminho_journal(caminho) if colunar.ativo() else caminho
+    fd, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho) or ".", prefix=os.path.basename(caminho) + ".", suffix=".tmp")
+    total = 0
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as saida:
+            escritor = csv.writer(saida, lineterminator="\n")
+            for registros in blocos:
+                if not registros:
+                    continue
+                total += len(registros)
+                registros = esquema.registros_utc(caminho, registros)
+                if colunar.ativo():
+                    saida.write(journal.serializar([{"op": "inserir", "id": r["id"], "dados": r} for r in registros]))
+                else:
+                    # Mesmo texto que o to_csv gera para colunas object (str(),
+                    # None vazio), sem o pandas inferir e formatar as datas; as
+                    # datas com hora já estão em UTC e saem com "+00:00".
+                    escritor.writerows([r.get(c) for c in colunas] for r in registros)
+        if total == 0:
+            return 0
+
+        with lock.escrita(caminho):
+            antes = assinatura(caminho)
+            if colunar.ativo():
+                journal.reparar(caminho)
+            with open(temporario, "rb") as origem, open(destino, "ab") as saida:
+                shutil.copyfileobj(origem, saida, csv_utils.TAMANHO_LEITURA)
+            if not colunar.ativo() and os.path.exists(indice.caminho_indice(caminho)):
+                indice.sincronizar(caminho)
+            _registrar_linhas(caminho, antes, delta=total)
+        return total
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+def atualizar(caminho: str, colunas: Iterable[str], registro_id: int, dados: dict) -> None:
+    aplicar_lote(caminho, colunas, [], [{"op": "atualizar", "id": registro_id, "dados": {**dados, "id": registro_id}}])
+
+def remover(caminho: str, colunas: Iterable[str], registro_id: int) -> None:
+    aplicar_lote(caminho, colunas, [], [{"op": "remover", "id": registro_id}])
+
+def contar(caminho: str, recontar: bool = False) -> int:
+    # O total fica no sidecar .meta junto da assinatura dos arquivos que ele
+    # descreve; só é recalculado se estiver ausente ou desatualizado.
+    if not _existe(caminho):
+        return 0
+    df = cache.tabela_em_cache(caminho, *_dependencias(caminho))
+    if df is not None and not recontar:
+        return len(df)
+
+    with lock.leitura(caminho):
+        atual = assinatura(caminho)
+        with metadados.editar(caminho) as meta:
+            linhas = meta.get("linhas")
+        if linhas is not None and linhas["assinatura"] == atual and not recontar:
+            return linhas["valor"]
+
+        if os.path.exists(journal.caminho_journal(caminho)):
+            total = len(carregar(caminho, []))
+        elif colunar.ativo():
+            total = colunar.contar(caminho)
+        else:
+            lido = indice.ler_se_atual(caminho)
+            total = len(lido[0]) if lido is not None else csv_utils.contar_linhas(caminho)
+        with metadados.editar(caminho) as meta:
+            meta["linhas"] = {"valor": total, "assinatura": atual}
+    return total
+
+def compactar(caminho: str) -> None:
+    # Também é quando os índices secundários mantidos em memória vão para o disco.
+    with lock.escrita(caminho):
+        operacoes = journal.ler_operacoes(caminho)
+        em_cache = cache.tabela_em_cache(caminho, *_dependencias(caminho))
+        if not operacoes or not _existe(caminho):
+            if em_cache is not None:
+                secundario.persistir(caminho, em_cache)
+            return
+        antes = assinatura(caminho)
+        df = _aplicar_journal(caminho, _ler_base(caminho), operacoes)
+        # O conteúdo não muda, então os índices da tabela em cache continuam valendo.
+        derivados = secundario.manter(caminho, em_cache, df) if em_cache is not None else {}
+        _escrever_base(df, caminho)
+        journal.descartar(caminho)
+        cache.atualizar_tabela(caminho, df, *_dependencias(caminho), derivados=derivados)
+        secundario.persistir(caminho, df)
+        _registrar_linhas(caminho, antes, total=len(df))
+        logger.info(f"Journal de {caminho} compactado ({len(df)} linhas)")
+
+def iniciar_compactador(caminhos: list[str]) -> threading.Event:
+    parar = threading.Event()
+
+    def executar():
+        while not parar.wait(config.INTERVALO_COMPACTACAO):
+            for caminho in caminhos:
+                try:
+                    compactar(caminho)
+                except Exception as e:
+                    logger.error(f"Erro ao compactar {caminho}: {e}")
+
+    threading.Thread(target=executar, name="compactador-journal", daemon=True).start()
+    return parar
@@ -0,0 +1,92 @@
+import os
+import threading
+from typing import Any, Callable
+import pandas as pd
+
+_lock = threading.Lock()
+_tabelas: dict[str, dict] = {}
+_contadores = {"hits": 0, "misses": 0}
+
+def assinatura_arquivo(caminho: str) -> tuple | None:
+    try:
+        st = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+def assinatura_tabela(caminho: str, dependencias: tuple[str, ...] = ()) -> tuple:
+    return tuple(assinatura_arquivo(arquivo) for arquivo in (caminho, *dependencias))
+
+def obter_tabela(caminho: str, carregar: Callable[[], pd.DataFrame], *dependencias: str) -> pd.DataFrame:
+    # A assinatura é lida antes do parse: se o arquivo mudar durante a leitura,
+    # a entrada fica com a assinatura antiga e é recarregada na próxima chamada.
+    assinatura = assinatura_tabela(caminho, dependencias)
+    with _lock:
+        entrada = _tabelas.get(caminho)
+        if entrada is not None and entrada["assinatura"] == assinatura:
+            _contadores["hits"] += 1
+            return entrada["df"]
+        _contadores["misses"] += 1
+
+    df = carregar()
+    with _lock:
+        _tabelas[caminho] = {"assinatura": assinatura, "df": df, "derivados": {}}
+    return df
+
+def tabela_em_cache(caminho: str, *dependencias: str) -> pd.DataFrame | None:
+    assinatura = assinatura_tabela(caminho, dependencias)
+    with _lock:
+        entrada = _tabelas.get(caminho)
+        if entrada is not None and entrada["assinatura"] == assinatura:
+            _contadores["hits"] += 1
+            return entrada["df"]
+    return None
+
+def obter_derivado(caminho: str, df: pd.DataFrame, nome: str, calcular: Callable[[pd.DataFrame], Any]) -> Any:
+    # Estruturas derivadas (índices, conjuntos de ids...) vivem junto da
+    # entrada e somem com ela; um DataFrame que não é o da entrada atual
+    # é calculado sem memoização.
+    with _lock:
+        entrada = _tabelas.get(caminho)
+        if entrada is None or entrada["df"] is not df:
+            entrada = None
+        elif nome in entrada["derivados"]:
+            return entrada["derivados"][nome]
+
+    valor = calcular(df)
+    if entrada is not None:
+        with _lock:
+            entrada["derivados"][nome] = valor
+    return valor
+
+def assinatura_em_cache(caminho: str, df: pd.DataFrame) -> tuple | None:
+    # Assinatura dos arquivos que `df` representa, se ele for a entrada atual.
+    with _lock:
+        entrada = _tabelas.get(caminho)
+        if entrada is None or entrada["df"] is not df:
+            return None
+        return entrada["assinatura"]
+
+def derivado_em_cache(caminho: str, nome: str) -> Any:
+    with _lock:
+        entrada = _tabelas.get(caminho)
+        return None if entrada is None else entrada["derivados"].get(nome)
+
+def atualizar_tabela(caminho: str, df: pd.DataFrame, *dependencias: str, derivados: dict | None = None) -> None:
+    # Chamado depois de uma escrita feita por este processo: o DataFrame em
+    # memória já reflete o arquivo, então não há motivo para reler do disco.
+    # Derivados mantidos pela própria escrita podem ser passados adiante.
+    with _lock:
+        _tabelas[caminho] = {"assinatura": assinatura_tabela(caminho, dependencias), "df": df, "derivados": dict(derivados or {})}
+
+def invalidar(caminho: str) -> None:
+    with _lock:
+        _tabelas.pop(caminho, None)
+
+def get_estatisticas() -> dict:
+    with _lock:
+        return {
+            "hits": _contadores["hits"],
+            "misses": _contadores["misses"],
+            "tabelas": {caminho: len(entrada["df"]) for caminho, entrada in _tabelas.items()},
+        }
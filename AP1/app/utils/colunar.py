@@ -0,0 +1,105 @@
+import os
+import tempfile
+from typing import Any, Iterable, Iterator
+import pandas as pd
+from pydantic import BaseModel
+from app import config
+from app.utils import filtragem
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Backend colunar (Parquet ou Arrow IPC): a tabela continua identificada pelo
+# caminho do CSV (locks, journal e .meta ficam onde sempre estiveram), mas os
+# dados ficam em <tabela>.parquet ou <tabela>.arrow.
+EXTENSOES = {"parquet": ".parquet", "arrow": ".arrow"}
+
+def ativo(formato: str | None = None) -> bool:
+    return (formato or config.FORMATO_ARMAZENAMENTO) in EXTENSOES
+
+def caminho_dados(csv_file: str, formato: str | None = None) -> str:
+    formato = formato or config.FORMATO_ARMAZENAMENTO
+    if formato not in EXTENSOES:
+        return csv_file
+    return os.path.splitext(csv_file)[0] + EXTENSOES[formato]
+
+def _exigir_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("Os formatos parquet e arrow exigem o pacote pyarrow")
+
+def abrir(csv_file: str, formato: str | None = None) -> Any:
+    # O fragmento guarda o arquivo aberto (o Arrow IPC via mmap), então
+    # continua lendo o mesmo snapshot mesmo se uma compactação trocar o
+    # arquivo com os.replace.
+    _exigir_pyarrow()
+    formato = formato or config.FORMATO_ARMAZENAMENTO
+    caminho = caminho_dados(csv_file, formato)
+    if formato == "arrow":
+        return ds.IpcFileFormat().make_fragment(pa.memory_map(caminho))
+    return ds.ParquetFileFormat().make_fragment(pa.OSFile(caminho))
+
+def ler(csv_file: str, colunas: list[str] | None = None, filtro: Any = None, formato: str | None = None) -> pd.DataFrame:
+    return abrir(csv_file, formato).to_table(columns=colunas, filter=filtro).to_pandas()
+
+def ler_em_blocos(fragmento: Any, tamanho: int, filtro: Any = None) -> Iterator[pd.DataFrame]:
+    for lote in fragmento.to_batches(filter=filtro, batch_size=tamanho):
+        yield lote.to_pandas()
+
+def ler_por_id(csv_file: str, registro_id: int) -> dict | None:
+    df = ler(csv_file, filtro=ds.field("id") == registro_id)
+    return None if df.empty else df.iloc[0].to_dict()
+
+def contar(csv_file: str) -> int:
+    # Parquet e Arrow IPC guardam o número de linhas nos metadados.
+    return abrir(csv_file).count_rows()
+
+def escrever(df: pd.DataFrame, csv_file: str, formato: str | None = None) -> None:
+    _exigir_pyarrow()
+    formato = formato or config.FORMATO_ARMAZENAMENTO
+    caminho = caminho_dados(csv_file, formato)
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    diretorio = os.path.dirname(caminho) or "."
+    fd, temporario = tempfile.mkstemp(dir=diretorio, prefix=os.path.basename(caminho) + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        if formato == "arrow":
+            with pa.OSFile(temporario, "wb") as saida, pa.ipc.new_file(saida, tabela.schema) as escritor:
+                escritor.write_table(tabela)
+        else:
+            pq.write_table(tabela, temporario)
+        modo = os.stat(caminho).st_mode & 0o777 if os.path.exists(caminho) else 0o644
+        os.chmod(temporario, modo)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+def expressao(modelo: type[BaseModel], filtros: dict, ids_extras: Iterable[int] = ()) -> Any:
+    # Pré-filtro empurrado para a leitura: só os filtros com comparação
+    # exata no Arrow (números, enums, booleanos). A máscara da filtragem
+    # continua sendo aplicada depois, e os ids tocados pelo journal sempre
+    # passam, já que o valor final deles pode ser diferente do arquivo.
+    resultado = None
+    for campo, operador, valor, tipo in filtragem.condicoes(modelo, filtros):
+        if tipo not in (filtragem.NUMERO, filtragem.ENUM, filtragem.BOOLEANO):
+            continue
+        coluna = ds.field(campo)
+        if operador == "min":
+            parcial = coluna >= valor
+        elif operador == "max":
+            parcial = coluna <= valor
+        elif isinstance(valor, (list, tuple, set)):
+            parcial = coluna.isin(list(valor))
+        else:
+            parcial = coluna == valor
+        resultado = parcial if resultado is None else resultado & parcial
+
+    ids_extras = list(ids_extras)
+    if resultado is not None and ids_extras:
+        resultado = resultado | ds.field("id").isin(ids_extras)
+    return resultado
@@ -1,39 +1,233 @@
+import csv
+import numpy as np
 import pandas as pd
 import zipfile
 import io
+import os
+import tempfile
 import hashlib
-import xml.etree.ElementTree as ET
+import zlib
+from typing import BinaryIO, Iterable, Iterator
 
-def csv_to_zip(csv_file: str) -> bytes:
-    with open(csv_file, "rb") as f:
-        csv_bytes = f.read()
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+TAMANHO_LEITURA = 1 << 20
+
+TIPOS_MIDIA = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+# Valores que o pd.read_csv lê como NaN e como booleanos, por padrão.
+_NULOS = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+})
+_VERDADEIROS = frozenset({"True", "TRUE", "true"})
+_FALSOS = frozenset({"False", "FALSE", "false"})
+
+# compressão -> (extensão do download, media type)
+FORMATOS_COMPRESSAO = {"zip": ("zip", "application/zip"), "gzip": ("csv.gz", "application/gzip"), "zstd": ("csv.zst", "application/zstd")}
+
+class _ArquivoLimitado(io.RawIOBase):
+    def __init__(self, arquivo, limite: int):
+        self._arquivo = arquivo
+        self._limite = limite
+        self._restante = limite
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, posicao: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            posicao += self._limite - self._restante
+        elif whence == io.SEEK_END:
+            posicao += self._limite
+        posicao = self._arquivo.seek(min(max(posicao, 0), self._limite))
+        self._restante = self._limite - posicao
+        return posicao
+
+    def readinto(self, buffer) -> int:
+        quantidade = min(len(buffer), self._restante)
+        if quantidade <= 0:
+            return 0
+        dados = self._arquivo.read(quantidade)
+        buffer[:len(dados)] = dados
+        self._restante -= len(dados)
+        return len(dados)
+
+    def close(self) -> None:
+        self._arquivo.close()
+        super().close()
+
+def abrir_snapshot(caminho: str) -> io.BufferedReader:
+    # Lê só os bytes que existiam na abertura: appends feitos depois não
+    # aparecem pela metade, e uma reescrita (rename) não afeta o descritor.
+    arquivo = open(caminho, "rb")
+    return io.BufferedReader(_ArquivoLimitado(arquivo, os.fstat(arquivo.fileno()).st_size))
 
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w") as zipf:
-        zipf.writestr(csv_file.split("/")[-1], csv_bytes)
+def escrever_atomico(df: pd.DataFrame, caminho: str) -> None:
+    # Escreve num temporário do mesmo diretório e troca com os.replace, então
+    # nenhum leitor vê o arquivo pela metade.
+    diretorio = os.path.dirname(caminho) or "."
+    fd, temporario = tempfile.mkstemp(dir=diretorio, prefix=os.path.basename(caminho) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            df.to_csv(f, index=False)
+        modo = os.stat(caminho).st_mode & 0o777 if os.path.exists(caminho) else 0o644
+        os.chmod(temporario, modo)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
 
-    zip_buffer.seek(0)
+def normalizar_tipos(df: pd.DataFrame, dtypes: dict | None = None) -> pd.DataFrame:
+    # Passa as linhas novas pelo mesmo caminho de escrita/leitura do CSV para
+    # que os tipos fiquem iguais aos da tabela que está em cache.
+    return pd.read_csv(io.StringIO(df.to_csv(index=False)), index_col=False, dtype=dtypes)
 
-    return zip_buffer.read()
+def _converter_campo(texto: str) -> object:
+    # Mesma inferência que o pd.read_csv faz para uma coluna de um só valor.
+    if texto in _NULOS:
+        return float("nan")
+    if texto in _VERDADEIROS:
+        return True
+    if texto in _FALSOS:
+        return False
+    if "_" not in texto:
+        try:
+            return int(texto)
+        except ValueError:
+            pass
+        try:
+            return float(texto)
+        except ValueError:
+            pass
+    return texto
 
-def csv_to_xml(csv_file: str) -> str:
-    df = pd.read_csv(csv_file)
+def _converter_texto(texto: str) -> object:
+    return float("nan") if texto in _NULOS else texto
 
-    tag = csv_file.split("/")[-1].split(".")[0]
-    root = ET.Element(tag + "s")
+def ler_registro(conteudo: bytes, textos: frozenset[str] = frozenset()) -> dict:
+    # Cabeçalho + uma linha do CSV, sem o custo fixo do pd.read_csv: é o
+    # caminho das buscas por id com o cache frio. As colunas em `textos`
+    # ficam como texto, como o read_csv com dtype=str as lê.
+    cabecalho, valores = csv.reader(io.StringIO(conteudo.decode("utf-8")))
+    return {
+        coluna: _converter_texto(valor) if coluna in textos else _converter_campo(valor)
+        for coluna, valor in zip(cabecalho, valores)
+    }
 
-    for _, row in df.iterrows():
-        elem = ET.SubElement(root, tag)
-        for key, value in row.items():
-            ET.SubElement(elem, key).text = str(value)
+def fatiar(df: pd.DataFrame, tamanho: int) -> Iterator[pd.DataFrame]:
+    if df.empty:
+        yield df
+    for inicio in range(0, len(df), tamanho):
+        yield df.iloc[inicio:inicio + tamanho]
 
-    return ET.tostring(root, encoding="utf-8", method="xml").decode("utf-8")
+def serializar_blocos(blocos: Iterable[pd.DataFrame], formato: str) -> Iterator[str]:
+    primeiro = True
+    for bloco in blocos:
+        if formato == "csv":
+            if primeiro or not bloco.empty:
+                yield bloco.to_csv(index=False, header=primeiro)
+        elif not bloco.empty:
+            yield bloco.to_json(orient="records", lines=True, force_ascii=False, date_format="iso")
+        primeiro = False
 
-def get_quantidade_total(csv_file: str) -> bytes:
-    return {"quantidade": len(pd.read_csv(csv_file, index_col=False))}
+class _Coletor(io.RawIOBase):
+    # Destino não "seekable" para o zipfile: ele passa a usar data
+    # descriptors e o que for escrito pode ser enviado logo em seguida.
+    def __init__(self):
+        self._blocos = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, dados) -> int:
+        self._blocos.append(bytes(dados))
+        return len(dados)
+
+    def esvaziar(self) -> bytes:
+        dados = b"".join(self._blocos)
+        self._blocos.clear()
+        return dados
+
+def arquivos_to_zip(membros: Iterable[tuple[str, BinaryIO]], nivel: int) -> Iterator[bytes]:
+    # `membros` pode ser um gerador: cada origem só é pedida depois que a
+    # anterior foi inteira para o zip.
+    coletor = _Coletor()
+    compressao = zipfile.ZIP_STORED if nivel == 0 else zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(coletor, "w", compression=compressao, compresslevel=nivel or None) as zipf:
+        for nome, origem in membros:
+            with zipf.open(nome, "w", force_zip64=True) as arquivo:
+                while bloco := origem.read(TAMANHO_LEITURA):
+                    arquivo.write(bloco)
+                    if dados := coletor.esvaziar():
+                        yield dados
+    yield coletor.esvaziar()
+
+def csv_to_zip(origem: BinaryIO, nome: str, nivel: int) -> Iterator[bytes]:
+    return arquivos_to_zip([(nome, origem)], nivel)
+
+def csv_to_gzip(origem: BinaryIO, nivel: int) -> Iterator[bytes]:
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    while bloco := origem.read(TAMANHO_LEITURA):
+        if dados := compressor.compress(bloco):
+            yield dados
+    yield compressor.flush()
+
+def csv_to_zstd(origem: BinaryIO, nivel: int) -> Iterator[bytes]:
+    compressor = zstandard.ZstdCompressor(level=nivel).compressobj()
+    while bloco := origem.read(TAMANHO_LEITURA):
+        if dados := compressor.compress(bloco):
+            yield dados
+    yield compressor.flush()
+
+def _escapar(coluna: pd.Series) -> pd.Series:
+    return coluna.astype(str).str.replace("&", "&amp;", regex=False).str.replace("<", "&lt;", regex=False).str.replace(">", "&gt;", regex=False)
+
+def csv_to_xml(origem: BinaryIO, tag: str, tamanho_bloco: int = 10000, dtypes: dict | None = None) -> Iterator[bytes]:
+    # Lê o CSV em blocos e monta cada bloco com operações vetorizadas de
+    # string, então a memória depende só do tamanho do bloco.
+    yield f"<{tag}s>".encode("utf-8")
+    with pd.read_csv(origem, chunksize=tamanho_bloco, dtype=dtypes) as leitor:
+        for bloco in leitor:
+            elementos = pd.Series(f"<{tag}>", index=bloco.index)
+            for coluna in bloco.columns:
+                elementos = elementos + f"<{coluna}>" + _escapar(bloco[coluna]) + f"</{coluna}>"
+            yield "".join(elementos + f"</{tag}>").encode("utf-8")
+    yield f"</{tag}s>".encode("utf-8")
+
+def ler_arquivo(arquivo: BinaryIO) -> Iterator[bytes]:
+    with arquivo:
+        while bloco := arquivo.read(TAMANHO_LEITURA):
+            yield bloco
+
+def contar_linhas(csv_file: str) -> int:
+    # Conta quebras de linha fora de aspas: a paridade acumulada das aspas diz
+    # se cada "\n" está dentro de um campo. Não passa pelo parser do pandas.
+    registros = 0
+    aspas_abertas = 0
+    ultimo = b"\n"
+    with open(csv_file, "rb") as f:
+        while bloco := f.read(TAMANHO_LEITURA):
+            dados = np.frombuffer(bloco, dtype=np.uint8)
+            paridade = (np.cumsum(dados == ord('"')) + aspas_abertas) % 2
+            registros += int(np.count_nonzero((dados == ord("\n")) & (paridade == 0)))
+            aspas_abertas = int(paridade[-1])
+            ultimo = bloco[-1:]
+    if ultimo != b"\n":
+        registros += 1
+    # A primeira linha é o cabeçalho.
+    return max(registros - 1, 0)
 
-def get_sha256(csv_file: str) -> str:
-    with open(csv_file, 'rb') as f:
-        file_data = f.read()
-        sha256_hash = hashlib.sha256(file_data).hexdigest()
-    return sha256_hash
\ No newline at end of file
+def get_sha256(origem: BinaryIO, sha256_hash=None):
+    # Recebe o hash parcial de uma geração anterior quando o arquivo só cresceu.
+    sha256_hash = sha256_hash or hashlib.sha256()
+    while bloco := origem.read(TAMANHO_LEITURA):
+        sha256_hash.update(bloco)
+    return sha256_hash
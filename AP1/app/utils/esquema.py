@@ -0,0 +1,229 @@
+import json
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from typing import Any, Literal, get_args, get_origin
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+from app.utils import filtragem
+
+# Modelo de cada tabela, registrado pelos services, para que as colunas
+# saiam do disco com o tipo do modelo e não como o texto gravado no CSV.
+_modelos: dict[str, type[BaseModel]] = {}
+_INTEIRO = "inteiro"
+_TEXTO = "texto"
+
+def registrar(caminho: str, modelo: type[BaseModel]) -> None:
+    _modelos[caminho] = modelo
+
+@lru_cache
+def _dtypes(modelo: type[BaseModel]) -> dict[str, Any]:
+    # Tipos compactos derivados das anotações: categorias fixas para os
+    # Literal, datetime64 para datas (datetime sempre em UTC, como a
+    # filtragem compara) e bool; inteiros ficam com o menor tipo que comporta
+    # os valores. Campos str são lidos como texto, senão um cpf ou telefone
+    # vira inteiro e perde os zeros à esquerda. Float e listas seguem como o
+    # read_csv os lê.
+    dtypes = {}
+    for nome, campo in modelo.model_fields.items():
+        anotacao = filtragem.anotacao_base(campo.annotation)
+        if get_origin(anotacao) is Literal:
+            dtypes[nome] = pd.CategoricalDtype(list(get_args(anotacao)))
+        elif anotacao is datetime:
+            dtypes[nome] = pd.DatetimeTZDtype("ns", "UTC")
+        elif anotacao is date:
+            dtypes[nome] = np.dtype("datetime64[ns]")
+        elif anotacao is bool:
+            dtypes[nome] = np.dtype(bool)
+        elif anotacao is int:
+            dtypes[nome] = _INTEIRO
+        elif anotacao is str:
+            dtypes[nome] = _TEXTO
+    return dtypes
+
+def dtypes_leitura(caminho: str) -> dict[str, Any]:
+    # Categorias e texto são lidos direto pelo parser, sem passar por uma
+    # coluna de strings ou de números; os demais tipos são convertidos
+    # depois, em tipar.
+    modelo = _modelos.get(caminho)
+    if modelo is None:
+        return {}
+    dtypes = {}
+    for campo, dtype in _dtypes(modelo).items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            dtypes[campo] = dtype
+        elif dtype is _TEXTO:
+            dtypes[campo] = str
+    return dtypes
+
+def colunas_texto(caminho: str) -> frozenset[str]:
+    modelo = _modelos.get(caminho)
+    if modelo is None:
+        return frozenset()
+    return frozenset(campo for campo, dtype in _dtypes(modelo).items() if dtype is _TEXTO)
+
+def _lista(valor: Any) -> list:
+    # No CSV a lista é gravada como "[2, 5]"; no Parquet vem como array.
+    if isinstance(valor, list):
+        return valor
+    if isinstance(valor, str):
+        return json.loads(valor)
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+    return []
+
+def _listas(coluna: pd.Series) -> list[list]:
+    # Um único json.loads para a coluna inteira em vez de um por linha; se
+    # algum valor não for o texto de uma lista, cada um é lido à parte.
+    valores = coluna.tolist()
+    if valores and all(isinstance(v, str) for v in valores):
+        try:
+            listas = json.loads("[" + ",".join(valores) + "]")
+        except ValueError:
+            listas = None
+        if listas is not None and len(listas) == len(valores) and all(isinstance(v, list) for v in listas):
+            return listas
+    return [_lista(v) for v in valores]
+
+def _data_hora_utc(coluna: pd.Series) -> pd.Series:
+    # O parser ISO do pandas fica várias vezes mais lento com o fuso no texto.
+    # Como as datas são gravadas em UTC ("+00:00"), o sufixo é cortado e o
+    # restante lido como horário sem fuso; outros formatos seguem o caminho geral.
+    if coluna.dtype == object and ((coluna.str.slice(-6) == "+00:00") | coluna.isna()).all():
+        return pd.to_datetime(coluna.str.slice(0, -6), errors="coerce", format="ISO8601").dt.tz_localize("UTC")
+    if coluna.dtype == object:
+        # Com fuso em uns valores e não em outros, o parser ISO aplica o fuso
+        # do primeiro aos que vieram sem: cada grupo é lido à parte.
+        com_fuso = coluna.str.contains(r"(?:Z|[+-]\d\d:?\d\d)$", na=False)
+        if com_fuso.any() and not com_fuso[coluna.notna()].all():
+            return _data_hora_utc(coluna.where(com_fuso)).fillna(_data_hora_utc(coluna.where(~com_fuso)))
+    return pd.to_datetime(coluna, errors="coerce", utc=True, format="ISO8601")
+
+def _converter(coluna: pd.Series, dtype: Any) -> pd.Series:
+    if dtype is _INTEIRO:
+        # Com valores ausentes a coluna vem como float e fica assim.
+        return pd.to_numeric(coluna, downcast="integer") if pd.api.types.is_integer_dtype(coluna.dtype) else coluna
+    if dtype is _TEXTO:
+        # Só chega aqui numérico o que não foi lido com dtypes_leitura (um
+        # Parquet gravado antes); os zeros à esquerda já não existem.
+        return coluna if coluna.dtype == object else coluna.astype(str).where(coluna.notna(), None).astype(object)
+    if coluna.dtype == dtype:
+        return coluna
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return _data_hora_utc(coluna)
+    if dtype.kind == "M":
+        return pd.to_datetime(coluna, errors="coerce", format="ISO8601")
+    if dtype == bool:
+        return coluna.astype(str).str.lower() == "true"
+    return coluna.astype(dtype)
+
+def tipar(caminho: str, df: pd.DataFrame) -> pd.DataFrame:
+    modelo = _modelos.get(caminho)
+    if modelo is None:
+        return df
+    convertidas = {}
+    for campo, dtype in _dtypes(modelo).items():
+        if campo in df.columns:
+            coluna = _converter(df[campo], dtype)
+            if coluna is not df[campo]:
+                convertidas[campo] = coluna
+    for campo, tipo in filtragem.tipos_colunas(modelo).items():
+        if tipo == filtragem.LISTA and campo in df.columns:
+            convertidas[campo] = _listas(df[campo])
+    return df.assign(**convertidas) if convertidas else df
+
+def tipar_registro(caminho: str, registro: dict) -> dict:
+    modelo = _modelos.get(caminho)
+    if modelo is None:
+        return registro
+    for campo, tipo in filtragem.tipos_colunas(modelo).items():
+        if tipo == filtragem.LISTA and campo in registro:
+            registro[campo] = _lista(registro[campo])
+    return registro
+
+@lru_cache
+def _datas(modelo: type[BaseModel]) -> dict[str, bool]:
+    # campo -> True para date, False para datetime
+    return {
+        campo: not isinstance(dtype, pd.DatetimeTZDtype)
+        for campo, dtype in _dtypes(modelo).items() if getattr(dtype, "kind", None) == "M"
+    }
+
+def registros_utc(caminho: str, registros: list[dict]) -> list[dict]:
+    # Para quem grava registros do modelo sem passar pelo pandas: datas com
+    # hora vão para UTC, e as sem fuso (as do default_factory) são tomadas
+    # como UTC, como no POST.
+    modelo = _modelos.get(caminho)
+    campos = [campo for campo, so_data in _datas(modelo).items() if not so_data] if modelo else []
+    for registro in registros:
+        for campo in campos:
+            valor = registro.get(campo)
+            if isinstance(valor, datetime):
+                registro[campo] = valor.replace(tzinfo=timezone.utc) if valor.tzinfo is None else valor.astimezone(timezone.utc)
+    return registros
+
+def _texto_data(coluna: pd.Series) -> pd.Series:
+    valores = coluna.to_numpy("datetime64[ns]")
+    texto = np.datetime_as_string(valores, unit="D").astype(object)
+    texto[np.isnat(valores)] = None
+    return pd.Series(texto, index=coluna.index)
+
+def _texto_data_hora(coluna: pd.Series) -> pd.Series:
+    # O mesmo texto que o str() de cada Timestamp em UTC gera (fração só
+    # quando existe, em micro ou nanossegundos), montado pelo numpy: o
+    # to_csv/astype(str) de uma coluna com fuso formata linha a linha e
+    # dominava o tempo de cada reescrita da tabela.
+    if coluna.empty:
+        return coluna.astype(object)
+    valores = coluna.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy("datetime64[ns]")
+    nulos = np.isnat(valores)
+    inteiros = valores.view("int64")
+    fracao = (inteiros % 10**9 != 0) & ~nulos
+    micro = fracao & (inteiros % 1000 == 0)
+    nano = fracao & ~micro
+    texto = np.datetime_as_string(valores, unit="s").astype("U29")
+    if micro.any():
+        texto[micro] = np.datetime_as_string(valores[micro], unit="us")
+    if nano.any():
+        texto[nano] = np.datetime_as_string(valores[nano], unit="ns")
+    texto = np.char.add(np.char.replace(texto, "T", " "), "+00:00").astype(object)
+    texto[nulos] = None
+    return pd.Series(texto, index=coluna.index)
+
+def exibir(caminho: str, df: pd.DataFrame) -> pd.DataFrame:
+    # Na saída as datas voltam ao texto que o CSV guarda ("2025-05-14" e
+    # "2025-05-14 18:30:00+00:00"), e não ao ISO do to_json/jsonable_encoder.
+    # É também o que vai para o disco nas reescritas do CSV.
+    modelo = _modelos.get(caminho)
+    if modelo is None:
+        return df
+    convertidas = {}
+    for campo, so_data in _datas(modelo).items():
+        if campo in df.columns and df[campo].dtype.kind == "M":
+            coluna = df[campo]
+            if so_data:
+                convertidas[campo] = _texto_data(coluna)
+            elif coluna.dt.tz is not None:
+                convertidas[campo] = _texto_data_hora(coluna)
+            else:
+                convertidas[campo] = coluna.astype(str).where(coluna.notna(), None)
+    return df.assign(**convertidas) if convertidas else df
+
+def registros(caminho: str, df: pd.DataFrame) -> list[dict]:
+    return exibir(caminho, df).to_dict(orient="records")
+
+def exibir_registro(caminho: str, registro: dict) -> dict:
+    modelo = _modelos.get(caminho)
+    if modelo is None:
+        return registro
+    for campo, so_data in _datas(modelo).items():
+        if campo not in registro:
+            continue
+        valor = registro[campo]
+        if valor is None or pd.isna(valor):
+            registro[campo] = None
+        elif so_data:
+            registro[campo] = pd.Timestamp(valor).strftime("%Y-%m-%d")
+        else:
+            registro[campo] = str(filtragem.valor_data(valor))
+    return registro
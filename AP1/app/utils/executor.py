@@ -0,0 +1,59 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+from app import config
+
+# Os routers são async, mas os services fazem I/O e pandas síncronos. Esse
+# trabalho roda em um pool limitado para não travar o event loop; o tempo
+# que cada chamada passa na fila antes de começar fica nas métricas.
+_pool: ThreadPoolExecutor | None = None
+_lock = threading.Lock()
+_metricas = {"chamadas": 0, "em_execucao": 0, "espera_total": 0.0, "espera_maxima": 0.0, "execucao_total": 0.0}
+
+def _medir(enfileirado: float, funcao: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    inicio = time.perf_counter()
+    espera = inicio - enfileirado
+    with _lock:
+        _metricas["chamadas"] += 1
+        _metricas["em_execucao"] += 1
+        _metricas["espera_total"] += espera
+        _metricas["espera_maxima"] = max(_metricas["espera_maxima"], espera)
+    try:
+        return funcao(*args, **kwargs)
+    finally:
+        with _lock:
+            _metricas["em_execucao"] -= 1
+            _metricas["execucao_total"] += time.perf_counter() - inicio
+
+def _obter_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=config.POOL_WORKERS, thread_name_prefix="ap1-io")
+        return _pool
+
+async def executar(funcao: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    chamada = functools.partial(_medir, time.perf_counter(), funcao, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(_obter_pool(), chamada)
+
+def encerrar() -> None:
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+def get_estatisticas() -> dict:
+    with _lock:
+        chamadas = _metricas["chamadas"]
+        return {
+            "workers": config.POOL_WORKERS,
+            "chamadas": chamadas,
+            "em_execucao": _metricas["em_execucao"],
+            "espera_media_ms": round(_metricas["espera_total"] / chamadas * 1000, 3) if chamadas else 0.0,
+            "espera_maxima_ms": round(_metricas["espera_maxima"] * 1000, 3),
+            "execucao_media_ms": round(_metricas["execucao_total"] / chamadas * 1000, 3) if chamadas else 0.0,
+        }
@@ -0,0 +1,218 @@
+import glob
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from typing import BinaryIO, Callable, Iterable, Iterator
+from fastapi import Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from app import config
+from app.utils import armazenamento, colunar, csv_utils, esquema, journal, lock, metadados
+
+# Exportações são guardadas por geração: a geração de uma tabela fica no
+# sidecar .meta e só muda quando a assinatura do CSV ou do journal muda, então
+# downloads repetidos reaproveitam o mesmo artefato e a geração serve de ETag.
+_lock = threading.Lock()
+_hashes: dict[str, dict] = {}
+
+def etag(geracao: int) -> str:
+    return f'"{geracao}"'
+
+def geracao(caminho: str) -> int:
+    # Deve ser chamada com o lock de leitura da tabela, para que a assinatura
+    # não mude no meio de uma escrita.
+    assinatura = armazenamento.assinatura(caminho)
+    with metadados.editar(caminho) as meta:
+        if meta.get("assinatura") != assinatura:
+            meta["geracao"] = meta.get("geracao", 0) + 1
+            meta["assinatura"] = assinatura
+        return meta["geracao"]
+
+def _pendente(caminho: str) -> bool:
+    return colunar.ativo() or os.path.exists(journal.caminho_journal(caminho))
+
+def _abrir_fonte(caminho: str, colunas: Iterable[str]) -> BinaryIO:
+    # Sem journal pendente o conteúdo exportado é o próprio arquivo; com
+    # journal (ou num formato colunar), é o CSV gerado a partir da tabela.
+    if not _pendente(caminho):
+        return csv_utils.abrir_snapshot(caminho)
+    df = armazenamento.carregar(caminho, colunas)
+    return io.BytesIO(esquema.exibir(caminho, df).to_csv(index=False).encode("utf-8"))
+
+def _remover_antigos(caminho: str, atual: int) -> None:
+    prefixo = os.path.join(config.DIRETORIO_EXPORTACAO, os.path.basename(caminho)) + "."
+    for antigo in glob.glob(glob.escape(prefixo) + "*"):
+        numero = antigo[len(prefixo):].split(".")[0]
+        if numero.isdigit() and int(numero) < atual:
+            try:
+                os.remove(antigo)
+            except FileNotFoundError:
+                pass
+
+def _guardar(destino: str, fontes: list[BinaryIO], blocos: Iterator[bytes]) -> Iterator[bytes]:
+    # O artefato vai para a resposta enquanto é gerado e, ao mesmo tempo,
+    # para um temporário que só vira cache se a geração terminar inteira.
+    fd, temporario = tempfile.mkstemp(dir=config.DIRETORIO_EXPORTACAO, suffix=".tmp")
+    try:
+        with ExitStack() as abertos, os.fdopen(fd, "wb") as saida:
+            for fonte in fontes:
+                abertos.enter_context(fonte)
+            for bloco in blocos:
+                saida.write(bloco)
+                yield bloco
+        os.replace(temporario, destino)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+def _gerar_e_guardar(caminho: str, extensao: str, atual: int, fonte: BinaryIO, blocos: Iterator[bytes]) -> Iterator[bytes]:
+    destino = os.path.join(config.DIRETORIO_EXPORTACAO, f"{os.path.basename(caminho)}.{atual}.{extensao}")
+    yield from _guardar(destino, [fonte], blocos)
+    _remover_antigos(caminho, atual)
+
+def _artefato(caminho: str, colunas: Iterable[str], extensao: str, gerar: Callable[[BinaryIO], Iterator[bytes]]) -> tuple[Iterator[bytes], str]:
+    armazenamento.garantir_arquivo(caminho, colunas)
+    os.makedirs(config.DIRETORIO_EXPORTACAO, exist_ok=True)
+    # O lock só cobre a leitura da geração e a abertura do snapshot da
+    # fonte; a geração do artefato segue sem bloquear escritores.
+    with lock.leitura(caminho):
+        atual = geracao(caminho)
+        destino = os.path.join(config.DIRETORIO_EXPORTACAO, f"{os.path.basename(caminho)}.{atual}.{extensao}")
+        try:
+            # O descritor aberto continua válido mesmo se outro processo
+            # remover o arquivo ao gerar uma geração mais nova.
+            return csv_utils.ler_arquivo(open(destino, "rb")), etag(atual)
+        except FileNotFoundError:
+            fonte = _abrir_fonte(caminho, colunas)
+    return _gerar_e_guardar(caminho, extensao, atual, fonte, gerar(fonte)), etag(atual)
+
+def obter_zip(caminho: str, colunas: Iterable[str], compressao: str = "zip", nivel: int = config.NIVEL_COMPRESSAO) -> tuple[Iterator[bytes], str]:
+    # Cada combinação de compressão e nível é um artefato próprio da geração.
+    nome = os.path.basename(caminho)
+    if compressao == "gzip":
+        return _artefato(caminho, colunas, f"{nivel}.gz", lambda fonte: csv_utils.csv_to_gzip(fonte, nivel))
+    if compressao == "zstd":
+        if csv_utils.zstandard is None:
+            raise ValueError("Compressão zstd indisponível: instale o pacote zstandard")
+        return _artefato(caminho, colunas, f"{nivel}.zst", lambda fonte: csv_utils.csv_to_zstd(fonte, nivel))
+    return _artefato(caminho, colunas, f"{nivel}.zip", lambda fonte: csv_utils.csv_to_zip(fonte, nome, nivel))
+
+def obter_xml(caminho: str, colunas: Iterable[str]) -> tuple[Iterator[bytes], str]:
+    tag = os.path.basename(caminho).split(".")[0]
+    return _artefato(caminho, colunas, "xml", lambda fonte: csv_utils.csv_to_xml(fonte, tag, config.TAMANHO_BLOCO, esquema.dtypes_leitura(caminho)))
+
+def obter_sha256(caminho: str, colunas: Iterable[str]) -> tuple[str, str]:
+    armazenamento.garantir_arquivo(caminho, colunas)
+    with lock.leitura(caminho):
+        atual = geracao(caminho)
+        with metadados.editar(caminho) as meta:
+            salvo = meta.get("sha256")
+        if salvo and salvo["geracao"] == atual:
+            return salvo["valor"], etag(atual)
+
+        with _lock:
+            estado = _hashes.get(caminho)
+        reescritas = None if _pendente(caminho) else metadados.reescritas(caminho)
+        with _abrir_fonte(caminho, colunas) as fonte:
+            # Writers só fazem append ou trocam o arquivo inteiro, contando a
+            # troca no .meta: sem reescrita desde o último hash, basta
+            # continuá-lo a partir de onde ele parou.
+            if reescritas is not None and estado is not None and estado["reescritas"] == reescritas and estado["tamanho"] <= os.stat(caminho).st_size:
+                fonte.seek(estado["tamanho"])
+                sha256_hash = csv_utils.get_sha256(fonte, estado["hash"].copy())
+            else:
+                sha256_hash = csv_utils.get_sha256(fonte)
+            tamanho = fonte.tell()
+        valor = sha256_hash.hexdigest()
+
+        with _lock:
+            _hashes[caminho] = {"reescritas": reescritas, "tamanho": tamanho, "hash": sha256_hash}
+        with metadados.editar(caminho) as meta:
+            meta["sha256"] = {"geracao": atual, "valor": valor}
+    return valor, etag(atual)
+
+class _ComHash:
+    # Calcula o sha256 e o tamanho do que passa para o zip, sem ler a fonte
+    # duas vezes.
+    def __init__(self, fonte: BinaryIO):
+        self._fonte = fonte
+        self.hash = hashlib.sha256()
+        self.tamanho = 0
+
+    def read(self, tamanho: int = -1) -> bytes:
+        bloco = self._fonte.read(tamanho)
+        self.hash.update(bloco)
+        self.tamanho += len(bloco)
+        return bloco
+
+def _membros_snapshot(tabelas: list[dict], fontes: list[BinaryIO]) -> Iterator[tuple[str, BinaryIO]]:
+    # O manifesto vai por último: só então os hashes das tabelas são conhecidos.
+    for tabela, fonte in zip(tabelas, fontes):
+        leitor = _ComHash(fonte)
+        yield tabela["arquivo"], leitor
+        tabela["bytes"] = leitor.tamanho
+        tabela["sha256"] = leitor.hash.hexdigest()
+    manifesto = {"criado_em": datetime.now(timezone.utc).isoformat(), "tabelas": tabelas}
+    yield "manifest.json", io.BytesIO(json.dumps(manifesto, ensure_ascii=False, indent=2).encode("utf-8"))
+
+def _remover_snapshots_antigos(atuais: list[int]) -> None:
+    # Remove só snapshots que nenhuma tabela tem mais nova que a atual; um
+    # gerado por outro processo depois deste fica.
+    prefixo = os.path.join(config.DIRETORIO_EXPORTACAO, "snapshot.")
+    for antigo in glob.glob(glob.escape(prefixo) + "*.zip"):
+        geracoes = antigo[len(prefixo):].split(".")[0].split("-")
+        if len(geracoes) != len(atuais) or not all(g.isdigit() for g in geracoes):
+            continue
+        geracoes = [int(g) for g in geracoes]
+        if geracoes != atuais and all(g <= a for g, a in zip(geracoes, atuais)):
+            try:
+                os.remove(antigo)
+            except FileNotFoundError:
+                pass
+
+def obter_snapshot(tabelas: dict[str, Iterable[str]], nivel: int = config.NIVEL_COMPRESSAO) -> tuple[Iterator[bytes], str]:
+    # Um zip com todas as tabelas no mesmo instante: os locks de leitura de
+    # todas são tomados juntos (sempre na mesma ordem, para não travar com
+    # outro leitor) enquanto as gerações são lidas e as fontes abertas. O
+    # artefato fica guardado até alguma das tabelas mudar de geração.
+    caminhos = sorted(tabelas)
+    for caminho in caminhos:
+        armazenamento.garantir_arquivo(caminho, tabelas[caminho])
+    os.makedirs(config.DIRETORIO_EXPORTACAO, exist_ok=True)
+
+    with ExitStack() as travas:
+        for caminho in caminhos:
+            travas.enter_context(lock.leitura(caminho))
+        atuais = [geracao(caminho) for caminho in caminhos]
+        chave = "-".join(str(g) for g in atuais)
+        destino = os.path.join(config.DIRETORIO_EXPORTACAO, f"snapshot.{chave}.{nivel}.zip")
+        try:
+            return csv_utils.ler_arquivo(open(destino, "rb")), f'"{chave}"'
+        except FileNotFoundError:
+            pass
+        fontes = [_abrir_fonte(caminho, tabelas[caminho]) for caminho in caminhos]
+        manifesto = [
+            {"arquivo": os.path.basename(caminho), "geracao": atual, "linhas": armazenamento.contar(caminho)}
+            for caminho, atual in zip(caminhos, atuais)
+        ]
+
+    def gerar() -> Iterator[bytes]:
+        yield from _guardar(destino, fontes, csv_utils.arquivos_to_zip(_membros_snapshot(manifesto, fontes), nivel))
+        _remover_snapshots_antigos(atuais)
+    return gerar(), f'"{chave}"'
+
+def resposta_arquivo(blocos: Iterator[bytes], tag: str, if_none_match: str | None, media_type: str, nome: str) -> Response:
+    if if_none_match == tag:
+        blocos.close()
+        return Response(status_code=304, headers={"ETag": tag})
+    headers = {"ETag": tag, "Content-Disposition": f"attachment; filename={nome}"}
+    return StreamingResponse(blocos, media_type=media_type, headers=headers)
+
+def resposta_sha256(valor: str, tag: str, if_none_match: str | None) -> Response:
+    if if_none_match == tag:
+        return Response(status_code=304, headers={"ETag": tag})
+    return JSONResponse({"hash_sha256": valor}, headers={"ETag": tag})
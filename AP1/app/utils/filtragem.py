@@ -0,0 +1,141 @@
+import json
+import types
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Iterator, Literal, Union, get_args, get_origin
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+from app.utils import cache
+
+TEXTO = "texto"
+NUMERO = "numero"
+BOOLEANO = "booleano"
+DATA = "data"
+ENUM = "enum"
+LISTA = "lista"
+
+def anotacao_base(anotacao: Any) -> Any:
+    # Optional[X] vira X
+    if get_origin(anotacao) in (Union, types.UnionType):
+        argumentos = [a for a in get_args(anotacao) if a is not type(None)]
+        return argumentos[0] if len(argumentos) == 1 else anotacao
+    return anotacao
+
+@lru_cache
+def tipos_colunas(modelo: type[BaseModel]) -> dict[str, str]:
+    tipos = {}
+    for nome, campo in modelo.model_fields.items():
+        anotacao = anotacao_base(campo.annotation)
+        origem = get_origin(anotacao)
+        if origem is Literal:
+            tipos[nome] = ENUM
+        elif origem is list:
+            tipos[nome] = LISTA
+        elif anotacao is bool:
+            tipos[nome] = BOOLEANO
+        elif anotacao in (int, float):
+            tipos[nome] = NUMERO
+        elif anotacao in (date, datetime):
+            tipos[nome] = DATA
+        else:
+            tipos[nome] = TEXTO
+    return tipos
+
+def _itens(valor: Any) -> frozenset:
+    if isinstance(valor, str):
+        return frozenset(json.loads(valor))
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return frozenset(valor)
+    return frozenset()
+
+def _indice_invertido(coluna: pd.Series) -> tuple[dict[Any, np.ndarray], int]:
+    # valor -> posições (ordenadas) das linhas cuja lista contém o valor.
+    listas = pd.Series([v if isinstance(v, list) else list(_itens(v)) for v in coluna], dtype=object)
+    explodida = listas.explode().dropna()
+    posicoes = explodida.index.to_numpy()
+    grupos = pd.Series(posicoes).groupby(explodida.to_numpy()).indices
+    return {valor: posicoes[i] for valor, i in grupos.items()}, len(coluna)
+
+def _preparar_coluna(coluna: pd.Series, tipo: str) -> Any:
+    if tipo == NUMERO:
+        return pd.to_numeric(coluna, errors="coerce")
+    if tipo == BOOLEANO:
+        if coluna.dtype == bool:
+            return coluna
+        return coluna.astype(str).str.lower() == "true"
+    if tipo == DATA:
+        return pd.to_datetime(coluna, errors="coerce", utc=True, format="ISO8601")
+    if tipo == LISTA:
+        return _indice_invertido(coluna)
+    if tipo == ENUM:
+        return coluna.astype(str)
+    return coluna.astype(str).str.lower()
+
+def _coluna(caminho: str, df: pd.DataFrame, campo: str, tipo: str) -> Any:
+    # A coluna tipada (ou já em minúsculas, para texto) é calculada uma vez
+    # por geração do cache e reaproveitada por todos os filtros seguintes.
+    return cache.obter_derivado(caminho, df, f"filtro:{campo}", lambda d: _preparar_coluna(d[campo], tipo))
+
+def valor_data(valor: Any) -> pd.Timestamp:
+    valor = pd.Timestamp(valor)
+    return valor.tz_localize("UTC") if valor.tzinfo is None else valor.tz_convert("UTC")
+
+def _mascara(coluna: Any, tipo: str, operador: str, valor: Any) -> np.ndarray:
+    if tipo == LISTA:
+        # Contém todos os valores pedidos: interseção das listas de posições
+        # do índice invertido, sem percorrer as linhas.
+        indice, tamanho = coluna
+        posicoes = None
+        for procurado in set(valor if isinstance(valor, (list, tuple, set)) else [valor]):
+            encontradas = indice.get(procurado, np.empty(0, dtype=np.int64))
+            posicoes = encontradas if posicoes is None else np.intersect1d(posicoes, encontradas, assume_unique=True)
+        resultado = np.zeros(tamanho, dtype=bool)
+        resultado[posicoes] = True
+        return resultado
+
+    if tipo == DATA:
+        valor = [valor_data(v) for v in valor] if isinstance(valor, (list, tuple, set)) else valor_data(valor)
+    elif tipo == TEXTO and operador == "eq" and not isinstance(valor, (list, tuple, set)):
+        return coluna.str.contains(str(valor).lower(), regex=False, na=False).to_numpy()
+
+    if operador == "min":
+        return (coluna >= valor).to_numpy()
+    if operador == "max":
+        return (coluna <= valor).to_numpy()
+    if isinstance(valor, (list, tuple, set)):
+        if tipo == TEXTO:
+            valor = [str(v).lower() for v in valor]
+        return coluna.isin(list(valor)).to_numpy()
+    return (coluna == valor).to_numpy()
+
+def coluna_preparada(caminho: str, df: pd.DataFrame, modelo: type[BaseModel], campo: str) -> Any:
+    return _coluna(caminho, df, campo, tipos_colunas(modelo).get(campo, TEXTO))
+
+def condicoes(modelo: type[BaseModel], filtros: dict) -> Iterator[tuple[str, str, Any, str]]:
+    # Cada filtro vira (campo, operador, valor, tipo): igualdade, `in`
+    # (listas) ou intervalo pelos sufixos _min/_max. Valores vazios são
+    # ignorados.
+    tipos = tipos_colunas(modelo)
+    for chave, valor in filtros.items():
+        if valor is None or (isinstance(valor, (list, tuple, set)) and not valor):
+            continue
+
+        campo, operador = chave, "eq"
+        if campo not in tipos and chave[-4:] in ("_min", "_max"):
+            campo, operador = chave[:-4], chave[-3:]
+        yield campo, operador, valor, tipos.get(campo, TEXTO)
+
+def mascara(caminho: str, df: pd.DataFrame, modelo: type[BaseModel], filtros: dict) -> np.ndarray | None:
+    # Comparações tipadas; busca por substring só para colunas de texto.
+    resultado = None
+    for campo, operador, valor, tipo in condicoes(modelo, filtros):
+        if campo not in df.columns:
+            continue
+        parcial = _mascara(_coluna(caminho, df, campo, tipo), tipo, operador, valor)
+        resultado = parcial if resultado is None else resultado & parcial
+    return resultado
+
+def filtrar(caminho: str, df: pd.DataFrame, modelo: type[BaseModel], filtros: dict) -> pd.DataFrame:
+    resultado = mascara(caminho, df, modelo, filtros)
+    return df if resultado is None else df[resultado]
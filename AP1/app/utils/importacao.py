@@ -0,0 +1,83 @@
+import json
+from typing import Any, BinaryIO, Callable, Iterator
+import pandas as pd
+from pydantic import BaseModel, ValidationError
+from app import config
+from app.utils import armazenamento, filtragem
+
+# Importação de CSV em blocos: o arquivo enviado é lido TAMANHO_BLOCO linhas
+# por vez, cada linha passa pelo modelo (e pela checagem de referências do
+# service) e só os blocos válidos seguem para armazenamento.importar. A
+# memória depende do tamanho do bloco, não do arquivo.
+
+def _campo(valor: str, tipo: str) -> Any:
+    # Tudo é lido como texto; o modelo faz as conversões. Listas vêm como
+    # JSON ("[2, 5]"), como o próprio CSV da tabela grava.
+    if tipo == filtragem.LISTA:
+        try:
+            return json.loads(valor)
+        except ValueError:
+            return valor
+    return valor
+
+def _mensagem(erro: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in erro.errors())
+
+def _validar_blocos(
+    arquivo: BinaryIO,
+    modelo: type[BaseModel],
+    verificar: Callable[[BaseModel], str | None] | None,
+    relatorio: dict,
+) -> Iterator[list[BaseModel]]:
+    tipos = filtragem.tipos_colunas(modelo)
+    linha = 0
+    try:
+        leitor = pd.read_csv(arquivo, dtype=str, keep_default_na=False, index_col=False, chunksize=config.TAMANHO_BLOCO)
+    except pd.errors.EmptyDataError:
+        raise ValueError("Arquivo CSV vazio")
+    with leitor:
+        for bloco in leitor:
+            # O id é sempre atribuído aqui, como no POST.
+            campos = [c for c in bloco.columns if c in tipos and c != "id"]
+            faltando = [nome for nome, campo in modelo.model_fields.items() if campo.is_required() and nome not in campos]
+            if faltando:
+                raise ValueError(f"Colunas obrigatórias ausentes no CSV: {', '.join(faltando)}")
+            validos = []
+            for valores in bloco[campos].itertuples(index=False, name=None):
+                linha += 1
+                try:
+                    # Célula vazia é campo ausente: o modelo aplica o default
+                    # (ou acusa o campo obrigatório), como num POST sem ele.
+                    item = modelo.model_validate({c: _campo(v, tipos[c]) for c, v in zip(campos, valores) if v != ""})
+                    erro = verificar(item) if verificar else None
+                except ValidationError as e:
+                    erro = _mensagem(e)
+                if erro:
+                    relatorio["rejeitados"] += 1
+                    if len(relatorio["erros"]) < config.LIMITE_ERROS_IMPORTACAO:
+                        relatorio["erros"].append({"linha": linha, "erro": erro})
+                    continue
+                validos.append(item)
+            relatorio["linhas"] = linha
+            yield validos
+
+def importar(
+    caminho: str,
+    modelo: type[BaseModel],
+    arquivo: BinaryIO,
+    verificar: Callable[[BaseModel], str | None] | None = None,
+) -> dict:
+    # `linha` no relatório é a posição do registro no arquivo, sem contar o
+    # cabeçalho. Só os primeiros LIMITE_ERROS_IMPORTACAO erros são listados.
+    relatorio = {"linhas": 0, "importados": 0, "rejeitados": 0, "erros": []}
+
+    def registros() -> Iterator[list[dict]]:
+        for validos in _validar_blocos(arquivo, modelo, verificar, relatorio):
+            novos = []
+            for item, novo_id in zip(validos, armazenamento.reservar_ids(caminho, len(validos))):
+                item.id = novo_id
+                novos.append(item.model_dump())
+            yield novos
+
+    relatorio["importados"] = armazenamento.importar(caminho, modelo.model_fields.keys(), registros())
+    return relatorio
@@ -0,0 +1,206 @@
+import bisect
+import os
+import struct
+from typing import BinaryIO
+import numpy as np
+
+# Índice de posições do CSV, com entradas de tamanho fixo (id, início, fim):
+# a busca por id abre o arquivo via mmap e, quando os ids estão em ordem
+# crescente (o caso normal, já que são sequenciais), faz busca binária sem
+# ler o índice inteiro. O cabeçalho guarda o inode do CSV, quantos bytes do
+# CSV já estão indexados, quantas entradas vêm em seguida e se estão ordenadas.
+_ASSINATURA = b"AP1IDX02"
+_CABECALHO = struct.Struct("<8sqqqq")
+_ENTRADA = np.dtype([("id", "<i8"), ("inicio", "<i8"), ("fim", "<i8")])
+_LOTE_VARREDURA = 65536
+_BLOCO_LIMITES = 1 << 23
+
+def caminho_indice(csv_file: str) -> str:
+    return csv_file + ".idx"
+
+def _entradas(ids: list, inicios: list, fins: list) -> np.ndarray:
+    entradas = np.empty(len(ids), dtype=_ENTRADA)
+    entradas["id"] = ids
+    entradas["inicio"] = inicios
+    entradas["fim"] = fins
+    return entradas
+
+def _varrer(csv_file: str, inicio: int, destino: BinaryIO, anterior: int | None = None) -> tuple[int, int, bool]:
+    # Percorre registros a partir de `inicio`, respeitando campos entre aspas
+    # que contenham quebras de linha. O id é sempre a primeira coluna. As
+    # entradas vão para `destino` a cada _LOTE_VARREDURA registros, então uma
+    # cauda grande (uma importação) não fica inteira em memória. Devolve
+    # quantas entradas gravou, até onde o CSV foi indexado e se os ids seguem
+    # crescentes depois de `anterior`.
+    quantidade = 0
+    crescente = True
+    ids, inicios, fins = [], [], []
+
+    def gravar() -> None:
+        nonlocal quantidade, crescente, anterior
+        if not ids:
+            return
+        lote = _entradas(ids, inicios, fins)
+        crescente = crescente and (anterior is None or ids[0] > anterior) and bool(np.all(lote["id"][1:] > lote["id"][:-1]))
+        destino.write(lote.tobytes())
+        quantidade += len(ids)
+        anterior = ids[-1]
+        ids.clear()
+        inicios.clear()
+        fins.clear()
+
+    with open(csv_file, "rb") as f:
+        f.seek(inicio)
+        posicao = inicio
+        inicio_registro = inicio
+        primeira_linha = b""
+        aspas_abertas = False
+        for linha in f:
+            if not aspas_abertas:
+                inicio_registro = posicao
+                primeira_linha = linha
+            if linha.count(b'"') % 2 == 1:
+                aspas_abertas = not aspas_abertas
+            posicao += len(linha)
+            if aspas_abertas:
+                continue
+            if inicio_registro == 0 or not primeira_linha.strip():
+                continue
+            ids.append(int(primeira_linha.split(b",", 1)[0]))
+            inicios.append(inicio_registro)
+            fins.append(posicao)
+            if len(ids) == _LOTE_VARREDURA:
+                gravar()
+        fim = inicio_registro if aspas_abertas else posicao
+    gravar()
+    return quantidade, fim, crescente
+
+def _fins_registros(csv_file: str) -> np.ndarray:
+    # Byte seguinte ao fim de cada registro, cabeçalho incluído, achado em
+    # blocos pelo numpy: uma quebra de linha só encerra o registro se o
+    # número de aspas antes dela é par.
+    fins = []
+    aspas = deslocamento = 0
+    with open(csv_file, "rb") as f:
+        while bloco := f.read(_BLOCO_LIMITES):
+            dados = np.frombuffer(bloco, dtype=np.uint8)
+            quebras = np.flatnonzero(dados == ord("\n"))
+            posicoes_aspas = np.flatnonzero(dados == ord('"'))
+            fechados = (aspas + np.searchsorted(posicoes_aspas, quebras)) % 2 == 0
+            fins.append(quebras[fechados] + deslocamento + 1)
+            aspas += len(posicoes_aspas)
+            deslocamento += len(bloco)
+    return np.concatenate(fins) if fins else np.empty(0, dtype=np.int64)
+
+def escrever(csv_file: str, ids: np.ndarray) -> None:
+    # Para um CSV que acabou de ser reescrito a partir de um DataFrame, com
+    # `ids` na ordem das linhas: só os limites dos registros precisam ser
+    # achados, sem a varredura linha a linha do reconstruir. Deve ser chamado
+    # com o lock de escrita.
+    st = os.stat(csv_file)
+    fins = _fins_registros(csv_file)
+    if len(fins) != len(ids) + 1 or fins[-1] != st.st_size:
+        reconstruir(csv_file)
+        return
+    ordenado = bool(np.all(ids[1:] > ids[:-1]))
+    temporario = caminho_indice(csv_file) + ".tmp"
+    with open(temporario, "wb") as f:
+        f.write(_CABECALHO.pack(_ASSINATURA, st.st_ino, st.st_size, len(ids), ordenado))
+        f.write(_entradas(ids, fins[:-1], fins[1:]).tobytes())
+    os.replace(temporario, caminho_indice(csv_file))
+
+def invalidar(csv_file: str) -> None:
+    try:
+        os.remove(caminho_indice(csv_file))
+    except FileNotFoundError:
+        pass
+
+def reconstruir(csv_file: str) -> None:
+    inode = os.stat(csv_file).st_ino
+    temporario = caminho_indice(csv_file) + ".tmp"
+    with open(temporario, "wb") as f:
+        f.seek(_CABECALHO.size)
+        quantidade, fim, ordenado = _varrer(csv_file, 0, f)
+        f.seek(0)
+        f.write(_CABECALHO.pack(_ASSINATURA, inode, fim, quantidade, ordenado))
+    os.replace(temporario, caminho_indice(csv_file))
+
+def _ler(csv_file: str) -> tuple[int, int, np.ndarray, bool] | None:
+    # As entradas vêm de um mmap: só as páginas tocadas pela busca são lidas.
+    caminho = caminho_indice(csv_file)
+    try:
+        with open(caminho, "rb") as f:
+            assinatura, inode, coberto, quantidade, ordenado = _CABECALHO.unpack(f.read(_CABECALHO.size))
+        tamanho = os.path.getsize(caminho)
+    except (FileNotFoundError, struct.error):
+        return None
+    if assinatura != _ASSINATURA or tamanho != _CABECALHO.size + quantidade * _ENTRADA.itemsize:
+        return None
+    if quantidade == 0:
+        entradas = np.empty(0, dtype=_ENTRADA)
+    else:
+        entradas = np.memmap(caminho, dtype=_ENTRADA, mode="r", offset=_CABECALHO.size, shape=(quantidade,))
+    return inode, coberto, entradas, bool(ordenado)
+
+def ler_se_atual(csv_file: str) -> tuple[np.ndarray, bool] | None:
+    # Só lê, sem corrigir nada: pode ser chamado com o lock de leitura.
+    lido = _ler(csv_file)
+    if lido is None:
+        return None
+    inode, coberto, entradas, ordenado = lido
+    st = os.stat(csv_file)
+    if inode != st.st_ino or coberto != st.st_size:
+        return None
+    return entradas, ordenado
+
+def sincronizar(csv_file: str) -> None:
+    # Pode reescrever o sidecar: deve ser chamado com o lock de escrita.
+    st = os.stat(csv_file)
+    caminho = caminho_indice(csv_file)
+    lido = _ler(csv_file)
+    if lido is None:
+        reconstruir(csv_file)
+        return
+
+    inode, coberto, entradas, ordenado = lido
+    quantidade = len(entradas)
+    if inode != st.st_ino or coberto > st.st_size:
+        reconstruir(csv_file)
+        return
+    if coberto == st.st_size:
+        return
+
+    # O CSV só cresceu desde a última sincronização: indexa apenas a cauda.
+    # O cabeçalho só é atualizado depois das entradas: até lá o tamanho do
+    # arquivo não bate com ele e os leitores tratam o índice como desatualizado.
+    anterior = int(entradas["id"][-1]) if quantidade else None
+    with open(caminho, "r+b") as f:
+        f.seek(_CABECALHO.size + quantidade * _ENTRADA.itemsize)
+        novas, fim, crescente = _varrer(csv_file, coberto, f, anterior)
+        f.truncate()
+        f.seek(0)
+        f.write(_CABECALHO.pack(_ASSINATURA, inode, fim, quantidade + novas, ordenado and crescente))
+
+def _posicao(entradas: np.ndarray, ordenado: bool, registro_id: int) -> int | None:
+    ids = entradas["id"]
+    if ordenado:
+        # bisect toca só ~log2(n) entradas do mmap; np.searchsorted copiaria
+        # a coluna inteira, que não é contígua no arquivo.
+        posicao = bisect.bisect_left(ids, registro_id)
+        return posicao if posicao < len(ids) and ids[posicao] == registro_id else None
+    posicoes = np.flatnonzero(ids == registro_id)
+    return int(posicoes[-1]) if len(posicoes) else None
+
+def ler_registro(csv_file: str, lido: tuple[np.ndarray, bool], registro_id: int) -> bytes | None:
+    entradas, ordenado = lido
+    posicao = _posicao(entradas, ordenado, registro_id)
+    if posicao is None:
+        return None
+    entrada = entradas[posicao]
+    with open(csv_file, "rb") as f:
+        f.seek(int(entrada["inicio"]))
+        return f.read(int(entrada["fim"]) - int(entrada["inicio"]))
+
+def ler_cabecalho(csv_file: str) -> bytes:
+    with open(csv_file, "rb") as f:
+        return f.readline()
@@ -0,0 +1,131 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from typing import BinaryIO, Callable
+from app.utils import csv_utils
+from app.utils.logger import get_logger
+
+logger = get_logger("armazenamento")
+_BLOCO_CAUDA = 64 * 1024
+
+def caminho_journal(csv_file: str) -> str:
+    return csv_file + ".journal"
+
+def serializar(operacoes: list[dict]) -> str:
+    return "".join(json.dumps(op, default=str, ensure_ascii=False) + "\n" for op in operacoes)
+
+def registrar(csv_file: str, operacoes: list[dict]) -> None:
+    linhas = serializar(operacoes)
+    reparar(csv_file)
+    with open(caminho_journal(csv_file), "a", encoding="utf-8") as f:
+        f.write(linhas)
+
+def _operacao(linha: bytes) -> dict | None:
+    try:
+        return json.loads(linha)
+    except ValueError:
+        return None
+
+def ler_operacoes(csv_file: str) -> list[dict]:
+    # Uma última linha ilegível é um registrar interrompido (o processo caiu
+    # no meio da escrita) e é ignorada; só é corrupção se vier algo depois.
+    caminho = caminho_journal(csv_file)
+    if not os.path.exists(caminho):
+        return []
+    operacoes = []
+    ilegivel = None
+    with open(caminho, "rb") as f:
+        for numero, linha in enumerate(f, start=1):
+            linha = linha.strip()
+            if not linha:
+                continue
+            if ilegivel is not None:
+                raise RuntimeError(f"Journal {caminho} corrompido na linha {ilegivel}")
+            op = _operacao(linha)
+            if op is None:
+                ilegivel = numero
+            else:
+                operacoes.append(op)
+    return operacoes
+
+def _ultima_linha(f: BinaryIO, tamanho: int) -> tuple[int, bytes]:
+    # Offset e conteúdo da última linha não vazia, lendo o arquivo de trás
+    # para frente.
+    fim = tamanho
+    cauda = b""
+    while fim > 0:
+        inicio = max(0, fim - _BLOCO_CAUDA)
+        f.seek(inicio)
+        cauda = f.read(fim - inicio) + cauda
+        fim = inicio
+        quebra = cauda.rstrip(b"\n").rfind(b"\n")
+        if quebra != -1:
+            return inicio + quebra + 1, cauda[quebra + 1:]
+    return 0, cauda
+
+def reparar(csv_file: str) -> None:
+    # Deve ser chamada com o lock de escrita da tabela: corta a linha
+    # incompleta deixada por uma queda no meio de um registrar, para que o
+    # próximo append não a transforme em corrupção no meio do arquivo.
+    caminho = caminho_journal(csv_file)
+    if not os.path.exists(caminho) or os.path.getsize(caminho) == 0:
+        return
+    with open(caminho, "rb+") as f:
+        tamanho = os.fstat(f.fileno()).st_size
+        inicio, linha = _ultima_linha(f, tamanho)
+        if not linha.strip() or _operacao(linha) is not None:
+            # Linha completa; se a queda foi logo antes da quebra, ela é reposta.
+            f.seek(tamanho - 1)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+            return
+        f.truncate(inicio)
+    logger.warning(f"Linha incompleta no fim de {caminho} descartada ({tamanho - inicio} bytes)")
+
+def aplicar(
+    df: pd.DataFrame,
+    operacoes: list[dict],
+    incluir_novos: bool = True,
+    normalizar: Callable[[pd.DataFrame], pd.DataFrame] = csv_utils.normalizar_tipos,
+) -> pd.DataFrame:
+    if not operacoes:
+        return df
+
+    # Só a última operação de cada id importa; reaplicar o journal é idempotente.
+    ultimas = {}
+    inseridos = {}
+    for op in operacoes:
+        ultimas[op["id"]] = op
+        if op["op"] == "inserir":
+            inseridos.setdefault(op["id"], len(inseridos))
+
+    ids = df["id"]
+    manter = ~ids.isin(list(ultimas))
+    atualizacoes = [op["dados"] for op in ultimas.values() if op["op"] != "remover"]
+    if not atualizacoes:
+        return df[manter].reset_index(drop=True)
+
+    novos = normalizar(pd.DataFrame(atualizacoes, columns=df.columns))
+    posicoes = pd.Index(ids).get_indexer(novos["id"])
+    # Ids que não estão no df só entram se foram inseridos pelo journal; vão
+    # para o fim, na ordem de inserção. Quem lê em blocos pede
+    # incluir_novos=False e trata as inserções à parte.
+    if incluir_novos:
+        ordem_insercao = novos["id"].map(inseridos)
+        novas_linhas = (posicoes == -1) & ordem_insercao.notna().to_numpy()
+        posicoes = np.where(novas_linhas, len(df) + ordem_insercao.fillna(0).to_numpy().astype(np.int64), posicoes)
+    validos = posicoes != -1
+    novos = novos[validos]
+    ordem = np.concatenate([np.flatnonzero(manter.to_numpy()), posicoes[validos]])
+    df = pd.concat([df[manter], novos], ignore_index=True)
+    return df.iloc[np.argsort(ordem, kind="stable")].reset_index(drop=True)
+
+def descartar(csv_file: str) -> None:
+    # Se o processo cair entre a troca do snapshot e a remoção, o journal é
+    # reaplicado sobre o snapshot novo sem efeito, já que as operações são
+    # idempotentes.
+    try:
+        os.remove(caminho_journal(csv_file))
+    except FileNotFoundError:
+        pass
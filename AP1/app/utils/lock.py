@@ -0,0 +1,46 @@
+import fcntl
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+# Locks compartilhado (leitura) / exclusivo (escrita) por tabela, via flock
+# em um arquivo <tabela>.csv.lock. Como o flock vale por descrição de
+# arquivo aberta, ele serializa tanto workers diferentes quanto threads do
+# mesmo processo. Uma thread que já tem o lock de uma tabela pode pedi-lo de
+# novo (leitura dentro de escrita, por exemplo) sem travar em si mesma.
+_locais = threading.local()
+
+def caminho_lock(csv_file: str) -> str:
+    return csv_file + ".lock"
+
+def _mantidos() -> dict[str, int]:
+    if not hasattr(_locais, "mantidos"):
+        _locais.mantidos = {}
+    return _locais.mantidos
+
+@contextmanager
+def _travar(csv_file: str, modo: int) -> Iterator[None]:
+    mantidos = _mantidos()
+    atual = mantidos.get(csv_file)
+    if atual is not None:
+        if modo == fcntl.LOCK_EX and atual == fcntl.LOCK_SH:
+            raise RuntimeError(f"Não é possível promover o lock de leitura de {csv_file} para escrita")
+        yield
+        return
+
+    os.makedirs(os.path.dirname(csv_file) or ".", exist_ok=True)
+    with open(caminho_lock(csv_file), "a") as f:
+        fcntl.flock(f, modo)
+        mantidos[csv_file] = modo
+        try:
+            yield
+        finally:
+            del mantidos[csv_file]
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def leitura(csv_file: str):
+    return _travar(csv_file, fcntl.LOCK_SH)
+
+def escrita(csv_file: str):
+    return _travar(csv_file, fcntl.LOCK_EX)
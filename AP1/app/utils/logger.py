@@ -1,22 +1,162 @@
+import atexit
+import fcntl
 import logging
+import multiprocessing.util
 import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from app import config
 
 LOG_DIR = "app/logs"
 os.makedirs(LOG_DIR, exist_ok=True)
 
+# As chamadas de log só enfileiram o registro; uma única thread por processo
+# escreve nos arquivos e no terminal, e só dá flush quando a fila esvazia.
+_FORMATO = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+_lock = threading.Lock()
+_estado: dict = {}
+
+class _ArquivoRotativo(RotatingFileHandler):
+    # Rotaciona por tamanho (RotatingFileHandler) ou quando passa o intervalo.
+    # Todos os workers escrevem no mesmo arquivo: a rotação acontece com um
+    # flock em <arquivo>.lock e quem encontra o arquivo já rotacionado por
+    # outro processo só o reabre, como o WatchedFileHandler.
+    def __init__(self, caminho: str):
+        super().__init__(caminho, maxBytes=config.LOG_MAX_BYTES, backupCount=config.LOG_BACKUPS, encoding="utf-8", delay=True)
+        self._proxima_rotacao = self._calcular_proxima()
+
+    def _calcular_proxima(self) -> float:
+        return time.time() + config.LOG_INTERVALO_ROTACAO * 3600 if config.LOG_INTERVALO_ROTACAO > 0 else float("inf")
+
+    def _desatualizado(self) -> bool:
+        if self.stream is None:
+            return False
+        try:
+            atual = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            return True
+        aberto = os.fstat(self.stream.fileno())
+        return (atual.st_dev, atual.st_ino) != (aberto.st_dev, aberto.st_ino)
+
+    def _reabrir(self) -> None:
+        # O arquivo é aberto de novo (delay) no próximo registro.
+        self.stream.close()
+        self.stream = None
+        self._proxima_rotacao = self._calcular_proxima()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self._desatualizado():
+            self._reabrir()
+        super().emit(record)
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        return time.time() >= self._proxima_rotacao or super().shouldRollover(record)
+
+    def doRollover(self) -> None:
+        with open(self.baseFilename + ".lock", "a") as trava:
+            fcntl.flock(trava, fcntl.LOCK_EX)
+            if self._desatualizado():
+                self._reabrir()
+            else:
+                super().doRollover()
+                self._proxima_rotacao = self._calcular_proxima()
+
+    def flush(self) -> None:
+        # O flush por registro fica a cargo do listener, em lote.
+        pass
+
+    def descarregar(self) -> None:
+        super().flush()
+
+class _Terminal(logging.StreamHandler):
+    def flush(self) -> None:
+        pass
+
+    def descarregar(self) -> None:
+        super().flush()
+
+class _Destinos(logging.Handler):
+    # Cada entidade continua com o seu app/logs/<entidade>.log.
+    def __init__(self):
+        super().__init__()
+        self.arquivos: dict[str, _ArquivoRotativo] = {}
+        self.terminal = _Terminal(sys.stderr)
+        self.terminal.setFormatter(_FORMATO)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        arquivo = self.arquivos.get(record.name)
+        if arquivo is None:
+            arquivo = self.arquivos[record.name] = _ArquivoRotativo(os.path.join(LOG_DIR, f"{record.name}.log"))
+            arquivo.setFormatter(_FORMATO)
+        arquivo.handle(record)
+        self.terminal.handle(record)
+
+    def descarregar(self) -> None:
+        for arquivo in self.arquivos.values():
+            arquivo.descarregar()
+        self.terminal.descarregar()
+
+    def close(self) -> None:
+        for arquivo in self.arquivos.values():
+            arquivo.close()
+        super().close()
+
+class _Escritor(QueueListener):
+    def handle(self, record: logging.LogRecord) -> None:
+        super().handle(record)
+        if self.queue.empty():
+            self.handlers[0].descarregar()
+
+    def stop(self) -> None:
+        super().stop()
+        self.handlers[0].descarregar()
+        self.handlers[0].close()
+
+class _Fila(QueueHandler):
+    # A fila e a thread são por processo: um worker criado por fork recebe
+    # as suas próprias na primeira mensagem.
+    def __init__(self):
+        super().__init__(None)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # A fila não sai do processo: a formatação fica para a thread escritora.
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        _fila().put_nowait(record)
+
+def _fila() -> queue.SimpleQueue:
+    with _lock:
+        if _estado.get("pid") != os.getpid():
+            fila = queue.SimpleQueue()
+            escritor = _Escritor(fila, _Destinos())
+            escritor.start()
+            _estado.update(pid=os.getpid(), fila=fila, escritor=escritor)
+            # Processos do multiprocessing criados por fork saem com os._exit,
+            # sem passar pelo atexit; os finalizers deles ainda rodam.
+            multiprocessing.util.Finalize(None, encerrar, exitpriority=0)
+        return _estado["fila"]
+
+def encerrar() -> None:
+    with _lock:
+        escritor = _estado.pop("escritor", None) if _estado.get("pid") == os.getpid() else None
+        _estado.clear()
+    if escritor is not None:
+        escritor.stop()
+
+atexit.register(encerrar)
+
+_handler = _Fila()
+
 def get_logger(entidade: str) -> logging.Logger:
     entidade = entidade.lower()
     logger = logging.getLogger(entidade)
     logger.setLevel(logging.INFO)
 
     if not logger.handlers:
-        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
-
-        file_handler = logging.FileHandler(os.path.join(LOG_DIR, f"{entidade}.log"), encoding="utf-8")
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-
-        stream_handler = logging.StreamHandler()
-        stream_handler.setFormatter(formatter)
-        logger.addHandler(stream_handler)
-    return logger
\ No newline at end of file
+        logger.addHandler(_handler)
+        logger.propagate = False
+    return logger
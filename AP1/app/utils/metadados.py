@@ -0,0 +1,56 @@
+import fcntl
+import json
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+def caminho_meta(csv_file: str) -> str:
+    return csv_file + ".meta"
+
+@contextmanager
+def editar(csv_file: str) -> Iterator[dict]:
+    # O flock é por descrição de arquivo aberta, então serializa tanto
+    # threads deste processo quanto outros workers.
+    with open(caminho_meta(csv_file), "a+", encoding="utf-8") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.seek(0)
+            conteudo = f.read()
+            try:
+                meta = json.loads(conteudo) if conteudo.strip() else {}
+            except json.JSONDecodeError:
+                meta = {}
+            original = dict(meta)
+            yield meta
+            if meta != original:
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(meta))
+                f.flush()
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def reescritas(csv_file: str) -> int:
+    with editar(csv_file) as meta:
+        return meta.get("reescritas", 0)
+
+def marcar_reescrita(csv_file: str) -> None:
+    # Chamada antes de trocar o arquivo de dados inteiro. O os.replace pode
+    # reaproveitar o inode, então (inode, tamanho) não prova que só houve
+    # appends; quem continua um cálculo incremental compara este contador.
+    with editar(csv_file) as meta:
+        meta["reescritas"] = meta.get("reescritas", 0) + 1
+
+def reservar_ids(csv_file: str, quantidade: int, valor_inicial: Callable[[], int]) -> range:
+    if quantidade < 1:
+        return range(0)
+    with editar(csv_file) as meta:
+        semeada = "proximo_id" in meta
+    # O valor inicial lê a tabela com o lock dela; calculá-lo fora do lock do
+    # sidecar evita inverter a ordem tabela -> sidecar usada pelos escritores.
+    inicial = None if semeada else valor_inicial()
+    with editar(csv_file) as meta:
+        if "proximo_id" not in meta:
+            meta["proximo_id"] = inicial
+        inicio = meta["proximo_id"]
+        meta["proximo_id"] = inicio + quantidade
+    return range(inicio, inicio + quantidade)
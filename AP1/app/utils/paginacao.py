@@ -0,0 +1,95 @@
+from typing import Iterable, Iterator
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+from app.utils import cache, filtragem, secundario
+
+def _campo_ordenacao(modelo: type[BaseModel], order_by: str) -> tuple[str, bool]:
+    decrescente = order_by.startswith("-")
+    campo = order_by.lstrip("-")
+    tipos = filtragem.tipos_colunas(modelo)
+    if campo not in tipos or tipos[campo] == filtragem.LISTA:
+        raise ValueError(f"Não é possível ordenar por '{campo}'")
+    return campo, decrescente
+
+def _ordem(caminho: str, df: pd.DataFrame, modelo: type[BaseModel], campo: str, decrescente: bool) -> np.ndarray:
+    def calcular(d: pd.DataFrame) -> np.ndarray:
+        valores = pd.Series(filtragem.coluna_preparada(caminho, d, modelo, campo)).reset_index(drop=True)
+        return valores.sort_values(ascending=not decrescente, kind="stable", na_position="last").index.to_numpy()
+    return cache.obter_derivado(caminho, df, f"ordem:{campo}:{decrescente}", calcular)
+
+def _ids_crescentes(caminho: str, df: pd.DataFrame) -> bool:
+    return cache.obter_derivado(caminho, df, "ids_crescentes", lambda d: bool(d["id"].is_monotonic_increasing))
+
+def paginar(
+    caminho: str,
+    df: pd.DataFrame,
+    modelo: type[BaseModel],
+    filtros: dict,
+    limit: int | None = None,
+    offset: int = 0,
+    after_id: int | None = None,
+    order_by: str | None = None,
+) -> pd.DataFrame:
+    # Trabalha só com vetores de posições e materializa apenas as linhas da
+    # página no final, em vez de copiar o resultado filtrado inteiro.
+    campo, decrescente = _campo_ordenacao(modelo, order_by) if order_by else ("id", False)
+    if after_id is not None and campo != "id":
+        raise ValueError("after_id só pode ser usado com ordenação por id")
+
+    mascara = secundario.mascara(caminho, df, modelo, filtros)
+    fim = None if limit is None else offset + limit
+
+    if order_by is None and mascara is None:
+        inicio = 0
+        if after_id is not None:
+            if not _ids_crescentes(caminho, df):
+                mascara = df["id"].to_numpy() > after_id
+            else:
+                inicio = int(np.searchsorted(df["id"].to_numpy(), after_id, side="right"))
+        if mascara is None:
+            pagina = df.iloc[inicio:]
+            return pagina.iloc[offset:fim]
+
+    if order_by is None:
+        ordem = np.arange(len(df))
+    else:
+        ordem = _ordem(caminho, df, modelo, campo, decrescente)
+
+    if after_id is not None:
+        ids = df["id"].to_numpy()[ordem]
+        ordem = ordem[ids < after_id] if decrescente else ordem[ids > after_id]
+    if mascara is not None:
+        ordem = ordem[mascara[ordem]]
+    return df.iloc[ordem[offset:fim]]
+
+def paginar_blocos(
+    caminho: str,
+    blocos: Iterable[pd.DataFrame],
+    modelo: type[BaseModel],
+    filtros: dict,
+    limit: int | None = None,
+    offset: int = 0,
+    after_id: int | None = None,
+) -> Iterator[pd.DataFrame]:
+    # Versão em streaming: só suporta a ordem do arquivo, então offset e
+    # limit são contados bloco a bloco e a leitura para ao completar a página.
+    pular = offset
+    restante = limit
+    primeiro = True
+    for bloco in blocos:
+        if after_id is not None:
+            bloco = bloco[bloco["id"] > after_id]
+        bloco = filtragem.filtrar(caminho, bloco, modelo, filtros)
+        if pular:
+            descartados = min(pular, len(bloco))
+            bloco = bloco.iloc[descartados:]
+            pular -= descartados
+        if restante is not None:
+            bloco = bloco.iloc[:restante]
+            restante -= len(bloco)
+        if primeiro or not bloco.empty:
+            yield bloco
+        primeiro = False
+        if restante == 0:
+            return
@@ -0,0 +1,335 @@
+import json
+import os
+import tempfile
+from typing import Any, Iterable
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+from app.utils import cache, filtragem
+
+# Índices secundários declarados por cada service. Os dois tipos guardam as
+# mesmas duas colunas, (valor, id), ordenadas pelo valor já preparado como a
+# filtragem o compara e, nos empates, pelo id; o "hash" responde igualdade
+# por uma tabela de valores distintos e o "ordenado" também responde
+# intervalos (_min/_max). Ficam em <tabela>.csv.sidx junto da assinatura dos
+# arquivos que descrevem.
+HASH = "hash"
+ORDENADO = "ordenado"
+_DERIVADO = "indices_secundarios"
+# Muda quando o preparo dos valores muda (ex.: cpf e telefone passaram a ser
+# lidos como texto), para que um .sidx gravado antes seja reconstruído.
+_VERSAO = 3
+_declarados: dict[str, tuple[type[BaseModel], dict[str, str]]] = {}
+
+def caminho_indices(csv_file: str) -> str:
+    return csv_file + ".sidx"
+
+def declarar(caminho: str, modelo: type[BaseModel], campos: dict[str, str]) -> None:
+    tipos = filtragem.tipos_colunas(modelo)
+    for campo, tipo_indice in campos.items():
+        if tipo_indice not in (HASH, ORDENADO):
+            raise ValueError(f"Tipo de índice inválido para '{campo}': {tipo_indice}")
+        if tipos.get(campo) in (None, filtragem.LISTA):
+            raise ValueError(f"Não é possível indexar o campo '{campo}'")
+    _declarados[caminho] = (modelo, dict(campos))
+
+def _chaves(coluna: Any, tipo: str) -> tuple[np.ndarray, np.ndarray]:
+    # Valores comparáveis pelo numpy e quais linhas entram no índice: NaN e
+    # NaT nunca satisfazem um filtro, então ficam de fora.
+    coluna = pd.Series(coluna)
+    if tipo == filtragem.NUMERO:
+        valores = coluna.to_numpy(dtype="float64", na_value=np.nan)
+        return valores, ~np.isnan(valores)
+    if tipo == filtragem.DATA:
+        validos = coluna.notna().to_numpy()
+        return coluna.dt.as_unit("ns").array.asi8, validos
+    if tipo == filtragem.BOOLEANO:
+        valores = coluna.to_numpy(dtype=bool)
+        return valores, np.ones(len(valores), dtype=bool)
+    valores = coluna.to_numpy(dtype=str)
+    return valores, np.ones(len(valores), dtype=bool)
+
+def _ordenar(valores: np.ndarray, ids: np.ndarray) -> dict:
+    ordem = np.lexsort((ids, valores))
+    return {"valores": valores[ordem], "ids": ids[ordem]}
+
+def _localizar(valores: np.ndarray, ids: np.ndarray, procurados: np.ndarray, ids_procurados: np.ndarray) -> np.ndarray:
+    # Posição de cada par (valor, id) na ordem do índice, onde está ou onde
+    # entraria: busca binária pelo valor e, dentro dos empates, pelo id.
+    inicios = np.searchsorted(valores, procurados, side="left")
+    fins = np.searchsorted(valores, procurados, side="right")
+    return np.array(
+        [inicio + int(np.searchsorted(ids[inicio:fim], id_)) for inicio, fim, id_ in zip(inicios.tolist(), fins.tolist(), ids_procurados.tolist())],
+        dtype=np.int64,
+    )
+
+def _entradas(caminho: str, df: pd.DataFrame, modelo: type[BaseModel], campo: str) -> tuple[np.ndarray, np.ndarray]:
+    tipo = filtragem.tipos_colunas(modelo)[campo]
+    valores, validos = _chaves(filtragem.coluna_preparada(caminho, df, modelo, campo), tipo)
+    return valores[validos], df["id"].to_numpy(dtype="int64")[validos]
+
+def _construir(caminho: str, df: pd.DataFrame) -> dict[str, dict]:
+    modelo, campos = _declarados[caminho]
+    return {campo: _ordenar(*_entradas(caminho, df, modelo, campo)) for campo in campos}
+
+def _descricao(caminho: str, assinatura: tuple) -> str:
+    return json.dumps({"versao": _VERSAO, "assinatura": assinatura, "campos": _declarados[caminho][1]})
+
+def _ler(caminho: str, assinatura: tuple) -> dict[str, dict] | None:
+    try:
+        with np.load(caminho_indices(caminho), allow_pickle=False) as arquivo:
+            if str(arquivo["descricao"]) != _descricao(caminho, assinatura):
+                return None
+            return {
+                campo: {"valores": arquivo[f"{campo}.valores"], "ids": arquivo[f"{campo}.ids"]}
+                for campo in _declarados[caminho][1]
+            }
+    except (FileNotFoundError, KeyError, ValueError, OSError):
+        return None
+
+def _gravar(caminho: str, assinatura: tuple, indices: dict[str, dict]) -> None:
+    arrays = {"descricao": np.array(_descricao(caminho, assinatura))}
+    for campo, indice in indices.items():
+        arrays[f"{campo}.valores"] = indice["valores"]
+        arrays[f"{campo}.ids"] = indice["ids"]
+    # Threads do pool podem gravar o mesmo índice ao mesmo tempo: cada uma
+    # usa o seu temporário, e o último os.replace vence.
+    destino = caminho_indices(caminho)
+    fd, temporario = tempfile.mkstemp(dir=os.path.dirname(destino) or ".", prefix=os.path.basename(destino) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(temporario, destino)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+def obter(caminho: str, df: pd.DataFrame) -> dict[str, dict]:
+    # Só a tabela atual do cache tem índice: ele é lido do disco se a
+    # assinatura bate ou construído (e gravado) a partir do DataFrame.
+    assinatura = cache.assinatura_em_cache(caminho, df)
+    if caminho not in _declarados or assinatura is None:
+        return {}
+
+    def carregar(d: pd.DataFrame) -> dict[str, dict]:
+        indices = _ler(caminho, assinatura)
+        if indices is None:
+            indices = _construir(caminho, d)
+            _gravar(caminho, assinatura, indices)
+        return indices
+    return cache.obter_derivado(caminho, df, _DERIVADO, carregar)
+
+def _linhas(df: pd.DataFrame, ids: np.ndarray) -> pd.DataFrame:
+    # Linhas dos ids pedidos por busca binária na coluna id, que segue
+    # crescente; um isin percorreria a tabela inteira.
+    coluna = df["id"].to_numpy(dtype="int64")
+    if len(coluna) == 0:
+        return df
+    if not (coluna[1:] > coluna[:-1]).all():
+        return df[np.isin(coluna, ids)]
+    posicoes = np.minimum(np.searchsorted(coluna, ids), len(coluna) - 1)
+    return df.iloc[np.sort(posicoes[coluna[posicoes] == ids])]
+
+def _manter_distintos(distintos: dict, valores: np.ndarray, removidas: np.ndarray, inseridas: np.ndarray, tocados: np.ndarray) -> dict:
+    # As faixas dos valores não tocados só se deslocam pelas entradas
+    # removidas antes delas e pelas inseridas antes ou no início delas; as
+    # dos valores tocados são refeitas por busca binária. O dicionário
+    # valor -> faixa é compartilhado entre gerações e só ganha chaves: quem
+    # ainda consulta o índice anterior ignora faixas além das suas.
+    inicios = distintos["inicios"] - np.searchsorted(removidas, distintos["inicios"], side="left")
+    fins = distintos["fins"] - np.searchsorted(removidas, distintos["fins"], side="left")
+    inicios = inicios + np.searchsorted(inseridas, inicios, side="right")
+    fins = np.maximum(fins + np.searchsorted(inseridas, fins, side="left"), inicios)
+
+    faixas = distintos["faixas"]
+    novas = [valor for valor in tocados.tolist() if valor not in faixas]
+    if novas:
+        inicios = np.concatenate([inicios, np.zeros(len(novas), dtype=np.int64)])
+        fins = np.concatenate([fins, np.zeros(len(novas), dtype=np.int64)])
+        for valor in novas:
+            faixas[valor] = len(faixas)
+    posicoes = np.array([faixas[valor] for valor in tocados.tolist()], dtype=np.int64)
+    inicios[posicoes] = np.searchsorted(valores, tocados, side="left")
+    fins[posicoes] = np.searchsorted(valores, tocados, side="right")
+    return {"faixas": faixas, "inicios": inicios, "fins": fins}
+
+def _editar(atual: np.ndarray, removidas: np.ndarray, inseridas: np.ndarray, novos: np.ndarray) -> np.ndarray:
+    # Remove as posições `removidas` e põe cada novo valor antes da posição
+    # correspondente de `inseridas` (as duas na numeração de `atual`),
+    # copiando cada trecho uma vez só, por fatias.
+    saida = np.empty(len(atual) - len(removidas) + len(novos), dtype=np.promote_types(atual.dtype, novos.dtype))
+    eventos = sorted([(p, 0, j) for j, p in enumerate(inseridas.tolist())] + [(p, 1, -1) for p in removidas.tolist()])
+    lido = escrito = 0
+    for posicao, remocao, j in eventos:
+        saida[escrito:escrito + posicao - lido] = atual[lido:posicao]
+        escrito += posicao - lido
+        lido = posicao
+        if remocao:
+            lido += 1
+        else:
+            saida[escrito] = novos[j]
+            escrito += 1
+    saida[escrito:] = atual[lido:]
+    return saida
+
+def _sem_repetidos(entradas: tuple[np.ndarray, np.ndarray], repetidos: set) -> tuple[np.ndarray, np.ndarray]:
+    manter = np.array([par not in repetidos for par in zip(entradas[0].tolist(), entradas[1].tolist())], dtype=bool)
+    return entradas[0][manter], entradas[1][manter]
+
+def _manter_indice(indice: dict, antigos: tuple[np.ndarray, np.ndarray], atuais: tuple[np.ndarray, np.ndarray]) -> dict | None:
+    # Pares (valor, id) que não mudaram ficam onde estão.
+    iguais = set(zip(antigos[0].tolist(), antigos[1].tolist())) & set(zip(atuais[0].tolist(), atuais[1].tolist()))
+    if iguais:
+        antigos, atuais = _sem_repetidos(antigos, iguais), _sem_repetidos(atuais, iguais)
+    if len(antigos[1]) == 0 and len(atuais[1]) == 0:
+        return indice
+
+    removidas = _localizar(indice["valores"], indice["ids"], *antigos)
+    if (removidas >= len(indice["ids"])).any():
+        return None
+    if (indice["ids"][removidas] != antigos[1]).any() or (indice["valores"][removidas] != antigos[0]).any():
+        return None
+    removidas = np.sort(removidas)
+
+    ordem = np.lexsort((atuais[1], atuais[0]))
+    novos_valores, novos_ids = atuais[0][ordem], atuais[1][ordem]
+    inseridas = _localizar(indice["valores"], indice["ids"], novos_valores, novos_ids)
+    mantido = {
+        "valores": _editar(indice["valores"], removidas, inseridas, novos_valores),
+        "ids": _editar(indice["ids"], removidas, inseridas, novos_ids),
+    }
+    if "hash" in indice:
+        tocados = np.unique(np.concatenate([antigos[0], novos_valores]).astype(mantido["valores"].dtype, copy=False))
+        # As faixas se deslocam pelas inserções contadas já sem as removidas.
+        inseridas = inseridas - np.searchsorted(removidas, inseridas, side="left")
+        mantido["hash"] = _manter_distintos(indice["hash"], mantido["valores"], removidas, inseridas, tocados)
+    return mantido
+
+def manter(caminho: str, antigo: pd.DataFrame, novo: pd.DataFrame, ids_afetados: Iterable[int] = ()) -> dict:
+    # Chamado por quem escreve, antes de trocar a tabela no cache: as
+    # entradas dos ids afetados saem e as linhas atuais deles entram nas
+    # posições achadas por busca binária, sem reordenar o índice, e a tabela
+    # hash é ajustada junto. Devolve os derivados para o cache.atualizar_tabela.
+    antigos = cache.derivado_em_cache(caminho, _DERIVADO)
+    if caminho not in _declarados or antigos is None or cache.assinatura_em_cache(caminho, antigo) is None:
+        return {}
+    modelo, campos = _declarados[caminho]
+    afetados = np.unique(np.fromiter(ids_afetados, dtype="int64"))
+    if len(afetados) == 0:
+        return {_DERIVADO: antigos}
+
+    linhas_antigas, linhas_novas = _linhas(antigo, afetados), _linhas(novo, afetados)
+    indices = {}
+    for campo in campos:
+        mantido = _manter_indice(
+            antigos[campo], _entradas(caminho, linhas_antigas, modelo, campo), _entradas(caminho, linhas_novas, modelo, campo)
+        )
+        # Índice que não bate com a tabela anterior: reconstrói na próxima consulta.
+        if mantido is None:
+            return {}
+        indices[campo] = mantido
+    return {_DERIVADO: indices}
+
+def persistir(caminho: str, df: pd.DataFrame) -> None:
+    # Índices mantidos em memória pelas escritas vão para o disco junto da
+    # compactação, em vez de a cada escrita.
+    assinatura = cache.assinatura_em_cache(caminho, df)
+    indices = cache.derivado_em_cache(caminho, _DERIVADO)
+    if caminho not in _declarados or assinatura is None or indices is None:
+        return
+    if _ler(caminho, assinatura) is None:
+        _gravar(caminho, assinatura, indices)
+
+def _distintos(indice: dict) -> dict:
+    # Tabela hash valor -> faixa [inicio, fim) em "valores", criada na
+    # primeira consulta de igualdade, guardada no próprio índice e ajustada
+    # pelo manter. "faixas" leva cada valor à sua posição em "inicios" e
+    # "fins"; um valor que deixou de existir fica com a faixa vazia.
+    if "hash" not in indice:
+        valores = indice["valores"]
+        inicios = np.flatnonzero(np.r_[True, valores[1:] != valores[:-1]]) if len(valores) else np.empty(0, dtype=np.int64)
+        indice["hash"] = {
+            "faixas": dict(zip(valores[inicios].tolist(), range(len(inicios)))),
+            "inicios": inicios,
+            "fins": np.r_[inicios[1:], len(valores)].astype(np.int64),
+        }
+    return indice["hash"]
+
+def _faixas_iguais(indice: dict, tipo_indice: str, procurados: np.ndarray) -> list[tuple[int, int]]:
+    if tipo_indice == HASH:
+        distintos = _distintos(indice)
+        total = len(distintos["inicios"])
+        encontrados = [p for p in (distintos["faixas"].get(v) for v in procurados.tolist()) if p is not None and p < total]
+        return list(zip(distintos["inicios"][encontrados], distintos["fins"][encontrados]))
+    valores = indice["valores"]
+    inicios = np.searchsorted(valores, procurados, side="left")
+    fins = np.searchsorted(valores, procurados, side="right")
+    return list(zip(inicios, fins))
+
+def _converter(tipo: str, valor: Any) -> Any:
+    if tipo == filtragem.NUMERO:
+        return float(valor)
+    if tipo == filtragem.DATA:
+        return filtragem.valor_data(valor).as_unit("ns").value
+    if tipo == filtragem.BOOLEANO:
+        return bool(valor)
+    return str(valor).lower() if tipo == filtragem.TEXTO else str(valor)
+
+def _faixas(indice: dict, tipo_indice: str, tipo: str, operador: str, valor: Any) -> list[tuple[int, int]] | None:
+    valores = indice["valores"]
+    if operador in ("min", "max"):
+        if tipo_indice != ORDENADO:
+            return None
+        # A varredura compara o texto em minúsculas com o valor como veio.
+        limite = str(valor) if tipo == filtragem.TEXTO else _converter(tipo, valor)
+        if operador == "min":
+            return [(int(np.searchsorted(valores, limite, side="left")), len(valores))]
+        return [(0, int(np.searchsorted(valores, limite, side="right")))]
+
+    if tipo == filtragem.TEXTO and not isinstance(valor, (list, tuple, set)):
+        # Texto único é busca por substring: percorre só os valores distintos.
+        distintos = _distintos(indice)
+        vivas = distintos["fins"] > distintos["inicios"]
+        inicios, fins = distintos["inicios"][vivas], distintos["fins"][vivas]
+        contem = np.flatnonzero(np.char.find(valores[inicios].astype(str, copy=False), str(valor).lower()) >= 0)
+        return list(zip(inicios[contem], fins[contem]))
+
+    procurados = valor if isinstance(valor, (list, tuple, set)) else [valor]
+    convertidos = np.array([_converter(tipo, v) for v in dict.fromkeys(procurados)])
+    return _faixas_iguais(indice, tipo_indice, convertidos)
+
+def _posicoes(caminho: str, df: pd.DataFrame, campo: str, indice: dict) -> np.ndarray:
+    # Posição no DataFrame de cada entrada do índice, uma vez por geração.
+    return cache.obter_derivado(
+        caminho, df, f"posicoes_indice:{campo}", lambda d: pd.Index(d["id"].to_numpy(dtype="int64")).get_indexer(indice["ids"])
+    )
+
+def mascara(caminho: str, df: pd.DataFrame, modelo: type[BaseModel], filtros: dict) -> np.ndarray | None:
+    # Cada filtro sobre um campo indexado vira faixas do índice; os demais
+    # seguem para a varredura da filtragem.
+    indices = obter(caminho, df)
+    if not indices:
+        return filtragem.mascara(caminho, df, modelo, filtros)
+
+    campos = _declarados[caminho][1]
+    resultado, restantes = None, {}
+    for chave, valor in filtros.items():
+        faixas = None
+        for campo, operador, valor_filtro, tipo in filtragem.condicoes(modelo, {chave: valor}):
+            if campo in indices:
+                faixas = _faixas(indices[campo], campos[campo], tipo, operador, valor_filtro)
+        if faixas is None:
+            restantes[chave] = valor
+            continue
+
+        posicoes = _posicoes(caminho, df, campo, indices[campo])
+        selecionadas = np.concatenate([posicoes[inicio:fim] for inicio, fim in faixas]) if faixas else np.empty(0, dtype=np.int64)
+        parcial = np.zeros(len(df), dtype=bool)
+        parcial[selecionadas[selecionadas >= 0]] = True
+        resultado = parcial if resultado is None else resultado & parcial
+
+    demais = filtragem.mascara(caminho, df, modelo, restantes)
+    if demais is None:
+        return resultado
+    return demais if resultado is None else resultado & demais
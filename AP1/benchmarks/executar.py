@@ -0,0 +1,244 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable
+import numpy as np
+from benchmarks import gerar_dados
+
+# Mede as cargas de trabalho do AP1 sobre tabelas sintéticas e imprime um
+# JSON com vazão, latência p50/p99 e pico de RSS por operação:
+#     python -m benchmarks.executar --linhas 10000 100000 --saida resultado.json
+# Cada tamanho roda em um processo separado, dentro de um diretório
+# temporário, para que caches e o pico de RSS de um não contaminem o outro.
+# As variáveis AP1_* (modo, formato, pool) são repassadas ao processo filho.
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAMADAS = ["servico", "asgi"]
+# Atualizações e remoções usam a metade superior dos ids; os pedidos criados
+# referenciam só a inferior, que continua existindo nas duas camadas.
+ENTIDADES = ["pedido", "cliente", "cardapio"]
+
+def _rss_pico_mb() -> float:
+    # ru_maxrss vem em KiB no Linux e em bytes no macOS.
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+def _resumir(latencias: list[float], duracao: float, erros: int) -> dict:
+    amostras = np.asarray(latencias) * 1000
+    return {
+        "operacoes": len(latencias),
+        "erros": erros,
+        "vazao_ops_s": round(len(latencias) / duracao, 2) if duracao else 0.0,
+        "p50_ms": round(float(np.percentile(amostras, 50)), 3) if len(amostras) else None,
+        "p99_ms": round(float(np.percentile(amostras, 99)), 3) if len(amostras) else None,
+        "rss_pico_mb": _rss_pico_mb(),
+    }
+
+def _payloads(rng: np.random.Generator, linhas: int) -> dict[str, Callable[[], dict]]:
+    referencias = max(linhas // 2, 1)
+    return {
+        "cliente": lambda: {
+            "nome": "Bench " + str(rng.integers(1_000_000)),
+            "email": f"bench{rng.integers(1_000_000)}@email.com",
+            "telefone": "85999990000",
+            "data_nascimento": "1990-01-01",
+            "cpf": str(rng.integers(10**10, 10**11)),
+        },
+        "cardapio": lambda: {
+            "nome": "Prato bench",
+            "descricao": "Gerado pelo benchmark",
+            "preco": round(float(rng.uniform(4, 120)), 2),
+            "categoria": "Principal",
+            "disponivel": True,
+        },
+        "pedido": lambda: {
+            "cliente_id": int(rng.integers(referencias)),
+            "itens": rng.integers(0, referencias, int(rng.integers(1, 5))).tolist(),
+            "data_hora_pedido": "2025-06-01T12:00:00+00:00",
+            "status": "Fechado",
+            "forma_pagamento": "Pix",
+        },
+    }
+
+def _servicos() -> dict[str, dict]:
+    # Importado só depois do chdir: os services usam caminhos relativos.
+    from app.schemas.cliente_model import Cliente
+    from app.schemas.cardapio_model import Cardapio
+    from app.schemas.pedido_model import Pedido
+    from app.services import cliente_service, cardapio_service, pedido_service
+    return {
+        "cliente": dict(
+            modelo=Cliente, criar=cliente_service.criar_cliente, buscar=cliente_service.listar_cliente_id,
+            filtrar=cliente_service.listar_clientes, atualizar=cliente_service.atualizar_cliente,
+            remover=cliente_service.remover_cliente, exportar=cliente_service.get_cliente_zip,
+            filtros={"nome": "silva", "limit": 50},
+        ),
+        "cardapio": dict(
+            modelo=Cardapio, criar=cardapio_service.criar_item_cardapio, buscar=cardapio_service.listar_item_cardapio_id,
+            filtrar=cardapio_service.listar_itens_cardapio, atualizar=cardapio_service.atualizar_item_cardapio,
+            remover=cardapio_service.remover_item_cardapio, exportar=cardapio_service.get_cardapio_zip,
+            filtros={"categoria": ["Bebida"], "preco_max": 20, "limit": 50},
+        ),
+        "pedido": dict(
+            modelo=Pedido, criar=pedido_service.criar_pedido, buscar=pedido_service.listar_pedido_id,
+            filtrar=pedido_service.listar_pedidos, atualizar=pedido_service.atualizar_pedido,
+            remover=pedido_service.remover_pedido, exportar=pedido_service.get_pedido_zip,
+            filtros={"status": ["Fechado"], "forma_pagamento": ["Pix"], "limit": 50},
+        ),
+    }
+
+def _medir(chamadas: list[Callable[[], Any]], preparar: Callable[[], Any] | None = None) -> dict:
+    # "preparar" roda antes de cada chamada e fica fora da medição.
+    latencias, erros, preparo = [], 0, 0.0
+    inicio = time.perf_counter()
+    for chamada in chamadas:
+        if preparar is not None:
+            t = time.perf_counter()
+            preparar()
+            preparo += time.perf_counter() - t
+        t = time.perf_counter()
+        try:
+            chamada()
+        except Exception:
+            erros += 1
+        latencias.append(time.perf_counter() - t)
+    return _resumir(latencias, time.perf_counter() - inicio - preparo, erros)
+
+def _consumir(exportar: Callable[..., tuple]) -> None:
+    arquivo, _ = exportar("zip")
+    for _ in arquivo:
+        pass
+
+def _camada_servico(operacoes: int, exportacoes: int, linhas: int, rng: np.random.Generator) -> dict:
+    servicos, payloads, resultado = _servicos(), _payloads(rng, linhas), {}
+    for entidade in ENTIDADES:
+        s, payload = servicos[entidade], payloads[entidade]
+        metade = linhas // 2
+        ids = (metade + rng.choice(linhas - metade, size=min(operacoes * 2, linhas - metade), replace=False)).tolist()
+        atualizar, remover = ids[:len(ids) // 2], ids[len(ids) // 2:]
+        modelo = s["modelo"]
+        resultado[entidade] = {
+            "criar": _medir([lambda: s["criar"](modelo(**payload())) for _ in range(operacoes)]),
+            "buscar_id": _medir([lambda i=i: s["buscar"](i) for i in atualizar]),
+            "filtrar": _medir([lambda: s["filtrar"](**s["filtros"]) for _ in range(operacoes)]),
+            "atualizar": _medir([lambda i=i: s["atualizar"](i, modelo(**payload())) for i in atualizar]),
+            # Sem a alteração antes de cada exportação a geração não muda e o
+            # artefato guardado seria servido sem ser gerado de novo.
+            "exportar": _medir(
+                [lambda: _consumir(s["exportar"]) for _ in range(exportacoes)],
+                preparar=lambda: s["atualizar"](atualizar[0], modelo(**payload())),
+            ),
+            "remover": _medir([lambda i=i: s["remover"](i) for i in remover]),
+        }
+    return resultado
+
+async def _medir_http(cliente: Any, requisicoes: list[tuple], concorrencia: int, preparar: tuple | None = None) -> dict:
+    latencias, erros, preparo, fila = [], 0, 0.0, list(reversed(requisicoes))
+
+    async def trabalhador():
+        nonlocal erros, preparo
+        while fila:
+            metodo, url, corpo = fila.pop()
+            if preparar is not None:
+                t = time.perf_counter()
+                await cliente.request(preparar[0], preparar[1], json=preparar[2]())
+                preparo += time.perf_counter() - t
+            t = time.perf_counter()
+            resposta = await cliente.request(metodo, url, json=corpo)
+            await resposta.aread()
+            latencias.append(time.perf_counter() - t)
+            erros += resposta.status_code >= 400
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    return _resumir(latencias, time.perf_counter() - inicio - preparo, erros)
+
+async def _camada_asgi(operacoes: int, exportacoes: int, linhas: int, concorrencia: int, rng: np.random.Generator) -> dict:
+    import httpx
+    from app.main import app
+    servicos, payloads, resultado = _servicos(), _payloads(rng, linhas), {}
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=None) as cliente:
+            for entidade in ENTIDADES:
+                payload, filtros = payloads[entidade], servicos[entidade]["filtros"]
+                vivos = (await cliente.get(f"/{entidade}/", params={"limit": operacoes * 2, "offset": linhas // 2})).json()
+                ids = [linha["id"] for linha in vivos]
+                atualizar, remover = ids[:len(ids) // 2], ids[len(ids) // 2:]
+                rota = f"/{entidade}"
+                resultado[entidade] = {
+                    "criar": await _medir_http(cliente, [("POST", f"{rota}/", payload()) for _ in range(operacoes)], concorrencia),
+                    "buscar_id": await _medir_http(cliente, [("GET", f"{rota}/{i}", None) for i in atualizar], concorrencia),
+                    "filtrar": await _medir_http(
+                        cliente, [("GET", str(httpx.URL(f"{rota}/", params=filtros)), None) for _ in range(operacoes)], concorrencia
+                    ),
+                    "atualizar": await _medir_http(cliente, [("PUT", f"{rota}/{i}", payload()) for i in atualizar], concorrencia),
+                    "remover": await _medir_http(cliente, [("DELETE", f"{rota}/{i}", None) for i in remover], concorrencia),
+                }
+                resultado[entidade]["exportar"] = await _medir_http(
+                    cliente, [("GET", f"{rota}/get_zip", None) for _ in range(exportacoes)], 1,
+                    preparar=("PUT", f"{rota}/{atualizar[0]}", payload),
+                )
+    return resultado
+
+def rodar(linhas: int, operacoes: int, exportacoes: int, camadas: list[str], concorrencia: int, semente: int) -> dict:
+    rng = np.random.default_rng(semente)
+    with tempfile.TemporaryDirectory(prefix="ap1-bench-") as diretorio:
+        inicio = time.perf_counter()
+        gerar_dados.gerar(diretorio, linhas, semente)
+        geracao = time.perf_counter() - inicio
+
+        os.chdir(diretorio)
+        sys.path.insert(0, RAIZ)
+        logging.disable(logging.INFO)
+        resultado = {"linhas": linhas, "geracao_dados_s": round(geracao, 3), "rss_inicial_mb": _rss_pico_mb()}
+        if "servico" in camadas:
+            resultado["servico"] = _camada_servico(operacoes, exportacoes, linhas, rng)
+        if "asgi" in camadas:
+            resultado["asgi"] = asyncio.run(_camada_asgi(operacoes, exportacoes, linhas, concorrencia, rng))
+            resultado["asgi"]["concorrencia"] = concorrencia
+        os.chdir(RAIZ)
+    return resultado
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks do AP1 sobre dados sintéticos")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10000], help="tamanhos de tabela, ex.: 10000 100000 1000000")
+    parser.add_argument("--operacoes", type=int, default=200, help="chamadas por operação")
+    parser.add_argument("--exportacoes", type=int, default=5, help="exportações zip por entidade")
+    parser.add_argument("--camadas", nargs="+", choices=CAMADAS, default=CAMADAS)
+    parser.add_argument("--concorrencia", type=int, default=8, help="clientes simultâneos na camada asgi")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--interno", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        resultado = rodar(args.linhas[0], args.operacoes, args.exportacoes, args.camadas, args.concorrencia, args.semente)
+        print(json.dumps(resultado))
+        return
+
+    resultados = []
+    for linhas in args.linhas:
+        comando = [
+            sys.executable, "-m", "benchmarks.executar", "--interno", "--linhas", str(linhas),
+            "--operacoes", str(args.operacoes), "--exportacoes", str(args.exportacoes),
+            "--camadas", *args.camadas, "--concorrencia", str(args.concorrencia), "--semente", str(args.semente),
+        ]
+        saida = subprocess.run(comando, cwd=RAIZ, check=True, capture_output=True, text=True).stdout
+        resultados.append(json.loads(saida.strip().splitlines()[-1]))
+
+    relatorio = json.dumps({"python": sys.version.split()[0], "resultados": resultados}, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(relatorio + "\n")
+    else:
+        print(relatorio)
+
+if __name__ == "__main__":
+    main()
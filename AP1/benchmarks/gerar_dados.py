@@ -0,0 +1,83 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+# Gera clientes, cardapio e pedidos sintéticos no layout de app/data, para
+# medir a API em tamanhos realistas:
+#     python -m benchmarks.gerar_dados /tmp/ap1-bench --linhas 100000
+NOMES = ["João", "Maria", "Carlos", "Ana", "Pedro", "Juliana", "Lucas", "Fernanda", "Rafael", "Beatriz"]
+SOBRENOMES = ["Silva", "Oliveira", "Souza", "Lima", "Costa", "Pereira", "Almeida", "Ribeiro"]
+PRATOS = ["Risoto", "Lasanha", "Salada", "Pudim", "Suco", "Bruschetta", "Moqueca", "Feijoada", "Torta", "Refrigerante"]
+CATEGORIAS = ["Entrada", "Principal", "Sobremesa", "Bebida", "Acompanhamento", "Outro"]
+STATUS = ["Em aberto", "Fechado"]
+FORMAS_PAGAMENTO = ["Pix", "Cartão", "Dinheiro", ""]
+
+def _escolher(rng: np.random.Generator, opcoes: list[str], linhas: int) -> np.ndarray:
+    return np.asarray(opcoes, dtype=object)[rng.integers(0, len(opcoes), linhas)]
+
+def gerar_clientes(linhas: int, rng: np.random.Generator) -> pd.DataFrame:
+    ids = np.arange(linhas)
+    nomes = _escolher(rng, NOMES, linhas) + " " + _escolher(rng, SOBRENOMES, linhas)
+    nascimento = np.datetime64("1950-01-01") + rng.integers(0, 20000, linhas).astype("timedelta64[D]")
+    return pd.DataFrame({
+        "id": ids,
+        "nome": nomes,
+        "email": [f"cliente{i}@email.com" for i in ids],
+        "telefone": (85900000000 + ids).astype(str),
+        "data_nascimento": pd.to_datetime(nascimento).strftime("%Y-%m-%d"),
+        "cpf": (10000000000 + ids * 7).astype(str),
+    })
+
+def gerar_cardapio(linhas: int, rng: np.random.Generator) -> pd.DataFrame:
+    ids = np.arange(linhas)
+    return pd.DataFrame({
+        "id": ids,
+        "nome": _escolher(rng, PRATOS, linhas) + " " + ids.astype(str),
+        "descricao": _escolher(rng, PRATOS, linhas) + " da casa",
+        "preco": np.round(rng.uniform(4, 120, linhas), 2),
+        "categoria": _escolher(rng, CATEGORIAS, linhas),
+        "disponivel": rng.random(linhas) < 0.9,
+    })
+
+def gerar_pedidos(linhas: int, clientes: int, cardapio: int, rng: np.random.Generator) -> pd.DataFrame:
+    quantidades = rng.integers(1, 5, linhas)
+    itens = rng.integers(0, cardapio, quantidades.sum())
+    listas = np.split(itens, np.cumsum(quantidades)[:-1])
+    instantes = pd.Timestamp("2025-01-01", tz="UTC") + pd.to_timedelta(rng.integers(0, 180 * 86400, linhas), unit="s")
+    return pd.DataFrame({
+        "id": np.arange(linhas),
+        "cliente_id": rng.integers(0, clientes, linhas),
+        "itens": ["[" + ", ".join(map(str, lista)) + "]" for lista in listas],
+        "data_hora_pedido": instantes.astype(str),
+        "status": _escolher(rng, STATUS, linhas),
+        "forma_pagamento": _escolher(rng, FORMAS_PAGAMENTO, linhas),
+    })
+
+def gerar(destino: str, linhas: int, semente: int = 42) -> dict[str, str]:
+    rng = np.random.default_rng(semente)
+    diretorio = os.path.join(destino, "app", "data")
+    os.makedirs(diretorio, exist_ok=True)
+    tabelas = {
+        "cliente": gerar_clientes(linhas, rng),
+        "cardapio": gerar_cardapio(linhas, rng),
+    }
+    tabelas["pedido"] = gerar_pedidos(linhas, linhas, linhas, rng)
+
+    caminhos = {}
+    for nome, df in tabelas.items():
+        caminhos[nome] = os.path.join(diretorio, f"{nome}.csv")
+        df.to_csv(caminhos[nome], index=False)
+    return caminhos
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Gera tabelas sintéticas para os benchmarks do AP1")
+    parser.add_argument("destino", help="diretório que recebe app/data/*.csv")
+    parser.add_argument("--linhas", type=int, default=10000)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+    for nome, caminho in gerar(args.destino, args.linhas, args.semente).items():
+        print(f"{nome}: {caminho}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import glob
+import os
+import shutil
+import pytest
+from app import config
+from app.migrar import ARQUIVOS
+from app.utils import cache, logger
+
+# Cada teste roda num diretório temporário com uma cópia dos CSVs de
+# app/data: os services usam caminhos relativos, como no benchmark.
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(params=["csv", "journal"])
+def dados(request, tmp_path, monkeypatch):
+    destino = tmp_path / "app" / "data"
+    destino.mkdir(parents=True)
+    (tmp_path / "app" / "logs").mkdir()
+    for arquivo in glob.glob(os.path.join(RAIZ, "app", "data", "*.csv")):
+        shutil.copy(arquivo, destino)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "MODO_ARMAZENAMENTO", request.param)
+    monkeypatch.setattr(config, "FORMATO_ARMAZENAMENTO", "csv")
+    monkeypatch.setattr(config, "DIRETORIO_EXPORTACAO", str(destino / "exports"))
+    for caminho in ARQUIVOS:
+        cache.invalidar(caminho)
+    yield request.param
+    for caminho in ARQUIVOS:
+        cache.invalidar(caminho)
+    # A thread de log guarda o stderr capturado deste teste e os arquivos de
+    # tmp_path: é encerrada aqui e recriada na próxima mensagem.
+    logger.encerrar()
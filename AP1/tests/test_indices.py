@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+from pandas.testing import assert_frame_equal
+from app.schemas.cliente_model import Cliente
+from app.schemas.pedido_model import Pedido
+from app.services import cliente_service, pedido_service
+from app.utils import cache, indice, secundario
+
+def _pedido(itens: list[int], status: str = "Fechado") -> Pedido:
+    return Pedido(cliente_id=1, itens=itens, data_hora_pedido="2025-06-01T12:00:00+00:00", status=status, forma_pagamento="Pix")
+
+def _cliente(cpf: str, email: str) -> Cliente:
+    return Cliente(nome="Teste", email=email, telefone="85999990000", data_nascimento="1990-01-01", cpf=cpf)
+
+def test_busca_por_id_no_disco_depois_de_atualizar_e_remover(dados):
+    ids = [r["id"] for r in pedido_service.listar_pedidos()]
+    pedido_service.atualizar_pedido(ids[0], _pedido([9, 8]))
+    pedido_service.remover_pedido(ids[1])
+    pedido_service.criar_pedido(_pedido([3]))
+    em_memoria = pd.DataFrame(pedido_service.listar_pedidos())
+
+    # Com o cache frio a busca por id lê o registro pelo índice de posições.
+    cache.invalidar(pedido_service.PEDIDO_FILE)
+    if dados == "csv":
+        assert indice.ler_se_atual(pedido_service.PEDIDO_FILE) is not None
+    do_disco = pd.DataFrame([pedido_service.listar_pedido_id(i) for i in em_memoria["id"]])
+    assert_frame_equal(do_disco, em_memoria)
+    with pytest.raises(HTTPException) as erro:
+        pedido_service.listar_pedido_id(ids[1])
+    assert erro.value.status_code == 404
+
+def test_indices_secundarios_acompanham_as_escritas(dados):
+    # Consultas antes das escritas criam os índices e as tabelas hash, que
+    # passam a ser mantidos pelas escritas em vez de reconstruídos.
+    pedido_service.listar_pedidos(status="Fechado")
+    cliente_service.listar_clientes(cpf=["0"])
+    ids = [r["id"] for r in pedido_service.listar_pedidos()]
+    pedido_service.atualizar_pedido(ids[0], _pedido([1], status="Em aberto"))
+    pedido_service.atualizar_pedido(ids[2], _pedido([2]))
+    pedido_service.remover_pedido(ids[1])
+    pedido_service.criar_pedido(_pedido([5], status="Em aberto"))
+    novo = cliente_service.criar_cliente(_cliente("12345678900", "novo@email.com"))
+    cliente_service.remover_cliente(cliente_service.listar_clientes()[0]["id"])
+
+    for caminho, carregar in ((pedido_service.PEDIDO_FILE, pedido_service.carregar_dados_csv), (cliente_service.CLIENTE_FILE, cliente_service.carregar_dados_csv)):
+        df = carregar()
+        mantidos = secundario.obter(caminho, df)
+        reconstruidos = secundario._construir(caminho, df)
+        for campo, esperado in reconstruidos.items():
+            assert mantidos[campo]["valores"].tolist() == esperado["valores"].tolist()
+            assert mantidos[campo]["ids"].tolist() == esperado["ids"].tolist()
+
+    todos = pd.DataFrame(pedido_service.listar_pedidos())
+    for status in ("Fechado", "Em aberto"):
+        filtrados = [r["id"] for r in pedido_service.listar_pedidos(status=status)]
+        assert filtrados == todos.loc[todos["status"] == status, "id"].tolist()
+    assert [r["id"] for r in cliente_service.listar_clientes(cpf=["12345678900"])] == [novo["id"]]
@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+from app.schemas.pedido_model import Pedido
+from app.services import pedido_service
+from app.utils import armazenamento, cache, journal
+
+def _pedidos() -> pd.DataFrame:
+    cache.invalidar(pedido_service.PEDIDO_FILE)
+    return pd.DataFrame(pedido_service.listar_pedidos())
+
+def _pedido(itens: list[int]) -> Pedido:
+    return Pedido(cliente_id=1, itens=itens, data_hora_pedido="2025-06-01T12:00:00+00:00", status="Fechado", forma_pagamento="Pix")
+
+def test_aplicar_duas_vezes_da_o_mesmo_resultado():
+    df = pd.DataFrame({"id": [0, 1, 2], "valor": ["a", "b", "c"]})
+    operacoes = [
+        {"op": "inserir", "id": 10, "dados": {"id": 10, "valor": "x"}},
+        {"op": "atualizar", "id": 1, "dados": {"id": 1, "valor": "b2"}},
+        {"op": "remover", "id": 2},
+        {"op": "atualizar", "id": 10, "dados": {"id": 10, "valor": "y"}},
+    ]
+    uma = journal.aplicar(df, operacoes)
+    assert uma["id"].tolist() == [0, 1, 10]
+    assert uma["valor"].tolist() == ["a", "b2", "y"]
+    assert_frame_equal(journal.aplicar(uma, operacoes), uma)
+
+@pytest.mark.parametrize("dados", ["journal"], indirect=True)
+def test_compactacao_interrompida_reaplica_o_journal_sem_efeito(dados):
+    # Queda entre a troca do snapshot e o descarte: o journal antigo volta a
+    # ser aplicado sobre um snapshot que já o contém.
+    ids = _pedidos()["id"].tolist()
+    pedido_service.atualizar_pedido(ids[0], _pedido([9]))
+    pedido_service.remover_pedido(ids[1])
+    pedido_service.criar_pedido(_pedido([4, 2]))
+    esperado = _pedidos()
+
+    caminho_journal = journal.caminho_journal(pedido_service.PEDIDO_FILE)
+    with open(caminho_journal, "rb") as f:
+        conteudo = f.read()
+    armazenamento.compactar(pedido_service.PEDIDO_FILE)
+    assert not journal.ler_operacoes(pedido_service.PEDIDO_FILE)
+    with open(caminho_journal, "wb") as f:
+        f.write(conteudo)
+
+    assert_frame_equal(_pedidos(), esperado)
+
+@pytest.mark.parametrize("dados", ["journal"], indirect=True)
+def test_ultima_linha_incompleta_e_ignorada(dados):
+    ids = _pedidos()["id"].tolist()
+    pedido_service.atualizar_pedido(ids[0], _pedido([9]))
+    esperado = _pedidos()
+    with open(journal.caminho_journal(pedido_service.PEDIDO_FILE), "ab") as f:
+        f.write(b'{"op": "remover", "id": ')
+
+    assert_frame_equal(_pedidos(), esperado)
+    pedido_service.atualizar_pedido(ids[1], _pedido([7]))
+    assert _pedidos().set_index("id").loc[ids[1], "itens"] == [7]
@@ -0,0 +1,47 @@
+import os
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+from app import config, migrar
+from app.schemas.pedido_model import Pedido
+from app.services import pedido_service
+from app.utils import cache, colunar, journal
+
+pytest.importorskip("pyarrow")
+
+def _pedidos() -> pd.DataFrame:
+    cache.invalidar(pedido_service.PEDIDO_FILE)
+    return pd.DataFrame(pedido_service.listar_pedidos())
+
+def _pedido(itens: list[int]) -> Pedido:
+    return Pedido(cliente_id=1, itens=itens, data_hora_pedido="2025-06-01T12:00:00+00:00", status="Fechado", forma_pagamento="Pix")
+
+def _migrar(origem: str, destino: str) -> None:
+    for caminho in migrar.ARQUIVOS:
+        migrar.migrar(caminho, origem, destino)
+
+@pytest.mark.parametrize("dados", ["journal"], indirect=True)
+def test_migrar_para_parquet_e_voltar_para_csv(dados, monkeypatch):
+    ids = _pedidos()["id"].tolist()
+    pedido_service.atualizar_pedido(ids[0], _pedido([9]))
+    pedido_service.remover_pedido(ids[1])
+    esperado = _pedidos()
+
+    _migrar("csv", "parquet")
+    assert not os.path.exists(journal.caminho_journal(pedido_service.PEDIDO_FILE))
+    assert os.path.exists(colunar.caminho_dados(pedido_service.PEDIDO_FILE, "parquet"))
+    # O CSV de origem também recebeu o journal: voltar a ele não perde nada.
+    assert_frame_equal(_pedidos(), esperado)
+
+    monkeypatch.setattr(config, "FORMATO_ARMAZENAMENTO", "parquet")
+    assert_frame_equal(_pedidos(), esperado)
+    pedido_service.criar_pedido(_pedido([4, 2]))
+    pedido_service.remover_pedido(ids[2])
+    esperado = _pedidos()
+    assert len(esperado) == len(ids) - 1
+
+    _migrar("parquet", "csv")
+    monkeypatch.setattr(config, "FORMATO_ARMAZENAMENTO", "csv")
+    assert_frame_equal(_pedidos(), esperado)
+    monkeypatch.setattr(config, "FORMATO_ARMAZENAMENTO", "parquet")
+    assert_frame_equal(_pedidos(), esperado)